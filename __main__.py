@@ -5,15 +5,26 @@ Include the GUI application of the game. Classes: MyGame.
 import pygame
 from game import QuoridorGame
 from guiutil import Text, Button, msgBox
-from threading import Thread, Lock
+from render import markDirty, updateDisplay
+from worker import AIWorker
+from threading import Lock
+from time import perf_counter
 from tkinter import Tk, Frame, Label, Button as tkButton, Radiobutton, Checkbutton, Entry, IntVar, StringVar
 
+AI_DONE = pygame.event.custom_type() # posted by the AIWorker when the move of an AI player is found
+
 class MyGame (QuoridorGame):
     """
     This class inherit from QuoridorGame.
     It include all the GUI of the game
     Attributes:
         gameLocker - Lock for the threads.
+        clock - pygame.time.Clock of the main loop, that limits the frame rate
+        frameTime - the seconds of the last update of the cursor and the selected option
+        __cursorShape - the current system cursor
+        aiWorker - AIWorker that finds the actions of the AI players in the background
+        thinkingText - Text of the AI player that thinks, with the elapsed time and the nodes searched
+        __thinkingRect - the rect of the thinkingText on the window, None if it is not displayed
         textFont - main text font of the game
         __isFullScreen - bool value to check if the game is displayed on full screen
         coloredOption - store the rect the showed as 'selected'
@@ -36,6 +47,11 @@ class MyGame (QuoridorGame):
         """
         super().__init__()
         self.gameLocker = Lock()
+        self.clock = pygame.time.Clock()
+        self.frameTime = 0.0
+        self.__cursorShape = None
+        self.aiWorker = AIWorker (lambda: pygame.event.post (pygame.event.Event (AI_DONE)))
+        self.__thinkingRect = None
         self.textFont = "tahoma"
         self.display (width, height, True)
         self.__isFullScreen = False
@@ -46,6 +62,7 @@ class MyGame (QuoridorGame):
         self.changeActionButton = Button (0.81, 0.3, 0.05, "Block", self.settings["button-color"], self.changeAction)
         self.turnText = Text (0.8, 0.2, 0.04, "player's turn", self.settings["background-color"], self.textFont)
         self.instructionText = Text (0.35, 0.9, 0.04, "Select the destination cell", self.settings["background-color"], self.textFont)
+        self.thinkingText = Text (0.75, 0.4, 0.03, "", self.settings["background-color"], self.textFont)
         self.quickStartButton = Button (0.45, 0.45, 0.05, "Quick Start", self.settings["button-color"], self.start)
         self.newGameButton = Button (0.45, 0.55, 0.05, "New Game", self.settings["button-color"], self.setup)
 
@@ -63,6 +80,8 @@ class MyGame (QuoridorGame):
         self.coloredOption = None
         self.uncoloredOption = None
         self.optionFixed = False
+        self.aiWorker.cancel()
+        self.__thinkingRect = None
         super().start()
         self.changeActionButton.text = "Block"
         self.turnText.text = self.currentPlayer.name + "'s turn"
@@ -84,6 +103,8 @@ class MyGame (QuoridorGame):
         """
         Override the over method. Just display the menu after the game end.
         """
+        self.aiWorker.cancel()
+        self.__thinkingRect = None
         self.draw()
         super().over()
         self.menu()
@@ -171,12 +192,13 @@ class MyGame (QuoridorGame):
                 self.setup (players= players,
                             ai_players = aiPlayers,
                             board_width = boardSize.get(),
-                            board_height = boardSize.get())
+                            board_height = boardSize.get(),
+                            ai_ponder = bool (ponder.get()))
                 win.destroy()
                 self.start()
                 
             win = Tk()
-            win.geometry ("400x350+350+150")
+            win.geometry ("400x390+350+150")
             win.title ("Game Setup")
             win.iconbitmap ("media/quoridor.ico")
 
@@ -195,6 +217,8 @@ class MyGame (QuoridorGame):
                 aiPlayersNames.append(IntVar (value = isAi))
             #variable for board size
             boardSize = IntVar (value = self.settings ["board-width"])
+            #the AI players think during the turns of the other players (uses the CPU while waiting)
+            ponder = IntVar (value = self.settings ["ai-ponder"])
 
             Label (frame, text="Number of players:", font=("Arial", 16, "bold"), pady = 5, padx = 15).grid (row=1, column=1, columnspan=3)
             Radiobutton (frame, text="2", value=2, variable = playersNum, command=addPlayers).grid (row=2, column=1)
@@ -224,12 +248,21 @@ class MyGame (QuoridorGame):
             Radiobutton (frame, text="9x9", variable = boardSize, value= 9, indicator=0, font=("Arial", 14), bg="light blue").grid (row=9, column=2)
             Label (frame, text="Big:").grid (row=8, column=3)
             Radiobutton (frame, text="13x13", variable = boardSize, value= 13, indicator=0, font=("Arial", 14), bg="light blue").grid (row=9, column=3)
+            Checkbutton (frame, text="AI thinks during your turn", variable=ponder, pady=10).grid (row=10, column=1, columnspan=3)
 
             #submit button
             tkButton (win, text="Start!", command=setupAndStart, font=("Arial", 16, "bold"), fg="green", width=20).pack()
             
             win.mainloop()
         
+    def draw (self, full=False):
+        """
+        Override the draw method. A full draw erases the thinkingText too.
+        """
+        if full:
+            self.__thinkingRect = None
+        super().draw (full)
+
     def fullScreen(self):
         """
         Toggle full screen.
@@ -241,6 +274,7 @@ class MyGame (QuoridorGame):
         else:
             self.window = pygame.display.set_mode(pygame.display.get_window_size(), pygame.FULLSCREEN)
             self.__isFullScreen = True
+        self.draw (full=True) # the window is new
             
     def changeAction (self):
         """
@@ -251,8 +285,10 @@ class MyGame (QuoridorGame):
             msgBox (showerror, title="Action restricted!", message="You have run out of blocks!")
             return False
         self.window.fill (self.settings["background-color"], self.instructionText.rect)
+        markDirty (self.instructionText.rect)
         if isinstance (self.coloredOption, Button):
             self.window.fill (self.settings["background-color"], self.coloredOption)
+            markDirty (self.coloredOption.rect)
         self.setColoredOption (None)
         self.board.currentGap = None
         self.currentPlayer.changeAction ()
@@ -295,6 +331,56 @@ class MyGame (QuoridorGame):
             self.instructionText.text = "Select the destination cell"
             self.draw()
         
+    @property
+    def aiTurn (self) -> bool:
+        """
+        Check if the game is running and the current player is an AI player.
+        """
+        return self.running and self.currentPlayer.isAi
+
+    def playAi (self):
+        """
+        Play the turn of the current AI player without blocking the window:
+        start the thinking in the aiWorker, show its progress until the action is found, and then play the action.
+        """
+        worker = self.aiWorker
+        if not worker.thinking:
+            #show the last action and the turn of the AI player during the thinking
+            self.turnText.text = self.currentPlayer.name + "'s turn"
+            self.turnText.textColor = self.currentPlayer.color
+            self.draw()
+            worker.start (self.currentPlayer)
+        action = worker.result()
+        if action is None:
+            self.showThinking()
+            return
+        self.hideThinking()
+        if action.player.searchEngine is not None:
+            print (action.player.searchEngine)
+        action()
+        print (action)
+        self.nextPlayer()
+
+    def showThinking (self):
+        """
+        Display the name of the AI player that thinks, the elapsed time and the number of nodes searched.
+        """
+        worker = self.aiWorker
+        nodes = worker.nodes
+        self.hideThinking()
+        self.thinkingText.textColor = worker.player.color
+        self.thinkingText.update (f"{worker.player.name}: {worker.elapsed:.1f}s" + (f", {nodes} nodes" if nodes else ""), self.window)
+        self.__thinkingRect = self.thinkingText.rect
+        updateDisplay()
+
+    def hideThinking (self):
+        """
+        Erase the thinkingText from the window.
+        """
+        if self.__thinkingRect:
+            markDirty (self.window.fill (self.settings["background-color"], self.__thinkingRect))
+            self.__thinkingRect = None
+
     def exit(self):
         """
         Close the game. Will display an 'Are you sure?' message.
@@ -324,10 +410,10 @@ class MyGame (QuoridorGame):
                             self.setColoredOption (gap)
                             return pygame.SYSTEM_CURSOR_HAND
             else:
-                for cell in self.currentPlayer.optionalMoves.values():
-                    if cell.rect.collidepoint (mousePosition):
-                        self.setColoredOption (cell)
-                        return pygame.SYSTEM_CURSOR_HAND
+                cell = self.board.getCellByPixel (*mousePosition)
+                if cell and cell in self.currentPlayer.optionalMoves.values():
+                    self.setColoredOption (cell)
+                    return pygame.SYSTEM_CURSOR_HAND
                     
         if not self.optionFixed:
             self.setColoredOption (None)
@@ -335,19 +421,18 @@ class MyGame (QuoridorGame):
 
     def showCursor (self):
         """
-        Display the cursor and the selected option.
-        """
-        while self.displayed:
-            try:
-                pygame.time.delay(50)
-                with self.gameLocker:
-                    if not self.running or not self.currentPlayer.isAi:
-                        pygame.mouse.set_cursor (self.cursor)
-                        self.showOption()
-                        pygame.display.update()
-            except Exception as e:
-                print(e)
-                break
+        Display the cursor and the selected option. called after the events of the mouse and the keyboard, instead of polling.
+        Only the changed areas of the window are updated, and the time of the update is stored in frameTime.
+        """
+        start = perf_counter()
+        if self.displayed and (not self.running or not self.currentPlayer.isAi):
+            shape = self.cursor
+            if shape != self.__cursorShape:
+                pygame.mouse.set_cursor (shape)
+                self.__cursorShape = shape
+            self.showOption()
+            updateDisplay()
+        self.frameTime = perf_counter() - start
 
     def setColoredOption (self, rect, fixed=False):
         """
@@ -367,10 +452,11 @@ class MyGame (QuoridorGame):
                 self.uncoloredOption.color = self.settings["button-color"]
                 self.uncoloredOption.draw (self.window)
             elif isinstance (self.uncoloredOption, pygame.Rect):
-                self.window.fill (self.board.cellColor, self.uncoloredOption.union(self.uncoloredOption.next))
+                markDirty (self.window.fill (self.board.cellColor, self.uncoloredOption.union(self.uncoloredOption.next)))
             else:
                 self.window.fill (self.board.cellColor, self.uncoloredOption.rect)
                 pygame.draw.rect (self.window, (0,0,0), self.uncoloredOption.rect, 1)
+                markDirty (self.uncoloredOption.rect)
             self.uncoloredOption = None
             
         if self.coloredOption:
@@ -378,31 +464,36 @@ class MyGame (QuoridorGame):
                 self.coloredOption.color = self.settings["button-selected"]
                 self.coloredOption.draw (self.window)
             elif isinstance (self.coloredOption, pygame.Rect):
-                self.window.fill ("red", self.coloredOption.union(self.coloredOption.next))
+                markDirty (self.window.fill ("red", self.coloredOption.union(self.coloredOption.next)))
             else:
                 self.window.fill ("red", self.coloredOption.rect)
                 pygame.draw.rect (self.window, (0,0,0), self.coloredOption.rect, 1)
+                markDirty (self.coloredOption.rect)
                 
 WIDTH = 700
 HEIGHT = 500
+MAX_FPS = 60 # the maximum number of updates of the window per second
+IDLE_TIMEOUT = 500 # milliseconds to wait for an event before checking the game again
+THINKING_TIMEOUT = 100 # milliseconds between the updates of the progress of an AI player
 directions = {pygame.K_UP:"top", pygame.K_RIGHT:"right", pygame.K_DOWN:"bottom", pygame.K_LEFT:"left"}
 
 if __name__ == "__main__":
     game = MyGame(WIDTH, HEIGHT)
     
-    cursorThread = Thread (target=game.showCursor)
-    cursorThread.start()
-    
     while game.displayed:
         
-        while game.running and game.currentPlayer.isAi:
-            #handle the AI Players
-            game.currentPlayer.autoAction()
-            game.nextPlayer()
-        else:
-            for event in pygame.event.get():
-                #handle events only if the current player is the user or if the game has not started
-                if event.type == pygame.QUIT:
+        if game.aiTurn:
+            #the AI players think in the background, and their actions are played when they are found
+            with game.gameLocker:
+                game.playAi()
+        if game.displayed:
+            #wait for an event without using the CPU, and handle all the events that are waiting together
+            events = [pygame.event.wait (THINKING_TIMEOUT if game.aiTurn else IDLE_TIMEOUT)] + pygame.event.get()
+            for event in events:
+                #handle the actions of the player only if the current player is the user or if the game has not started
+                if event.type in (pygame.NOEVENT, AI_DONE):
+                    continue
+                elif event.type == pygame.QUIT:
                     with game.gameLocker:
                         game.exit()
                     
@@ -412,6 +503,8 @@ if __name__ == "__main__":
                     elif event.key == pygame.K_ESCAPE:
                         with game.gameLocker:
                             game.exit()
+                    elif game.aiTurn:
+                        pass #the other keys are for the user
                     elif event.key == pygame.K_TAB:
                         if game.running:
                             game.changeAction()
@@ -463,15 +556,22 @@ if __name__ == "__main__":
                                     game.nextPlayer()
                         
                 elif event.type == pygame.VIDEORESIZE:
-                    game.draw()
+                    game.draw (full=True)
                     
                 elif event.type == pygame.MOUSEBUTTONUP:
-                    if game.coloredOption:
+                    if game.coloredOption and not game.aiTurn:
                         with game.gameLocker:
                             if isinstance (game.coloredOption, Button):
                                 game.coloredOption.action()
                             else:
                                 game.nextPlayer()
+
+            if game.displayed and any (event.type not in (pygame.NOEVENT, AI_DONE) for event in events):
+                #the cursor and the selected option are updated once for all the events, at most MAX_FPS times per second
+                with game.gameLocker:
+                    game.showCursor()
+                game.clock.tick (MAX_FPS)
                 
     #outside of the loop, displayed attribute is False
+    game.aiWorker.cancel()
     game.close()
\ No newline at end of file
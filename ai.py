@@ -2,7 +2,9 @@
 This module is for all the AI components in the game.
 Include the path finding algorithm and the definition of AIPlayer.
 """
-from queue import Queue
+from collections import deque
+from heapq import heappush, heappop
+from random import Random
 
 class Action:
     """
@@ -12,6 +14,7 @@ class Action:
     cell - cell to move or to put a block
     canceller - used in the undo method to cancel the execution of the action after checking the score
     direction - optional, direction of the block. default is 0 = horizontal
+    the score is checked only at the first time that it is needed, and then stored.
     """
     def __init__ (self, player, name, cell, direction = 0):
         self.player = player
@@ -19,7 +22,7 @@ class Action:
         self.cell = cell
         self.canceller = None
         self.direction = direction
-        self.checkScore ()
+        self.__score = None
 
     def __call__ (self, undo=False):
         """
@@ -44,7 +47,7 @@ class Action:
         """
         if self.canceller:
             if self.name == "block":
-                self.player.game.board.blocks.pop (self.canceller - 1)
+                self.player.game.board.popBlock (self.canceller - 1)
                 self.player.blocks += 1
             else:
                 self.player.cell = self.canceller
@@ -52,11 +55,36 @@ class Action:
         else:
             raise Exception ("Can not undo the last action.")
 
+    @classmethod
+    def fromMove (cls, player, move: int):
+        """
+        Create the action of a move of GameState (an index of a cell, or a block move) for the player.
+        """
+        board = player.game.board
+        n = len (board)
+        if move < n:
+            return cls (player, "move", board.cells[move])
+        direction, index = divmod (move - n, n)
+        return cls (player, "block", board.cells[index], direction)
+
     def __repr__ (self):
         return f"AIPlayer: {self.player.name} {self.name} {str (self.direction) + ' ' if self.name == 'block' else ''}{self.cell}"
 
+    @property
+    def key (self) -> tuple:
+        """
+        Returns a tuple (name, direction, x, y) that identify the action. two actions with the same key are the same action.
+        """
+        return (self.name, self.direction if self.name == "block" else 0, self.cell.x, self.cell.y)
+
+    def __eq__ (self, other) -> bool:
+        try:
+            return self.player is other.player and self.key == other.key
+        except AttributeError:
+            return False
+
     def __hash__ (self):
-        return hash (repr (self))
+        return hash (self.key)
 
     def checkScore (self):
         """
@@ -73,8 +101,7 @@ class Action:
         if self(True):
             shortest = len (self.player.game.board)
             for p in self.player.game.players:
-                path = findPath (p)
-                length = len (path)
+                length = pathLength (p)
                 if p is self.player:
                     myLength = length
                 else:
@@ -87,42 +114,243 @@ class Action:
 
     @property
     def score (self):
+        if self.__score is None:
+            self.checkScore()
         return self.__score
+
+    @score.setter
+    def score (self, value: int):
+        """
+        Set a score that was checked in another way (like ScoringPool), instead of checkScore.
+        """
+        self.__score = value
         
+class DistanceField:
+    """
+    This class stores the distance of every cell in the board to a target (a row or a column), ignoring the players.
+    The distances are computed once by a breadth first search from the target cells,
+    and then updated when a block is added or removed, only for the cells that their distance is changed.
+    The updates use work buffers that are allocated once with the field, so adding or removing a block allocates no new containers.
+    The board can be any object with width, height, openNeighbors and len, like Board.
+    openNeighbors must accept a list to fill (see Board.openNeighbors). the methods distance and path need also indexOf and cells.
+    Attributes:
+        board - the Board instance
+        target - the target as a tuple ("x", column) or ("y", row), like Player.targetAsTuple
+        unreachable - the distance of a cell that can not reach the target
+        distances - list of the distances, by the order of the cells in the board
+        __queue - the queue of the breadth first search
+        __stack, __heap - the cells to check and the cells to compute again after a block was added (the heap items are distance * cells + index)
+        __invalid - the cells that lost all their shortest paths after a block was added
+        __marks - the number of the last update in which every cell was added to __invalid, so the set of the invalid cells needs no allocation
+        __update - the number of the current update
+        __neighbors, __supporters - lists for openNeighbors, one for the loops and one for __supported inside them
+    """
+    def __init__ (self, board, target: tuple):
+        self.board = board
+        self.target = target
+        self.unreachable = len (board)
+        if target[0] == "x":
+            goals = list (range (target[1] - 1, len (board), board.width))
+        else:
+            goals = list (range ((target[1] - 1) * board.width, target[1] * board.width))
+        self.distances = [self.unreachable] * len (board)
+        for index in goals:
+            self.distances[index] = 0
+        self.__queue = deque (goals)
+        self.__stack = []
+        self.__heap = []
+        self.__invalid = []
+        self.__marks = [0] * len (board)
+        self.__update = 0
+        self.__neighbors = []
+        self.__supporters = []
+        self.__spread()
+
+    def __spread (self):
+        """
+        Decrease the distances of the neighbors of the cells in the queue, until no distance can be decreased.
+        """
+        distances = self.distances
+        openNeighbors = self.board.openNeighbors
+        neighbors = self.__neighbors
+        q = self.__queue
+        while q:
+            index = q.popleft()
+            distance = distances[index] + 1
+            for neighbor in openNeighbors (index, neighbors):
+                if distance < distances[neighbor]:
+                    distances[neighbor] = distance
+                    q.append (neighbor)
+
+    def __supported (self, index: int) -> bool:
+        """
+        Check if the cell has a neighbor that is nearer to the target and is not invalid in the current update.
+        """
+        distances = self.distances
+        if distances[index] == 0:
+            return True
+        marks, update = self.__marks, self.__update
+        for neighbor in self.board.openNeighbors (index, self.__supporters):
+            if distances[neighbor] == distances[index] - 1 and marks[neighbor] != update:
+                return True
+        return False
+
+    def edgesAdded (self, edges):
+        """
+        Update the distances after a block was removed.
+        edges is a sequence of pairs of two indexes of cells that are connected now.
+        """
+        distances = self.distances
+        q = self.__queue
+        for first, second in edges:
+            if distances[second] + 1 < distances[first]:
+                distances[first] = distances[second] + 1
+                q.append (first)
+            if distances[first] + 1 < distances[second]:
+                distances[second] = distances[first] + 1
+                q.append (second)
+        self.__spread()
+
+    def edgesRemoved (self, edges):
+        """
+        Update the distances after a block was added.
+        edges is a sequence of pairs of two indexes of cells that are not connected anymore.
+        First find all the cells that lost all their shortest paths, and then compute again only their distances.
+        """
+        distances = self.distances
+        openNeighbors = self.board.openNeighbors
+        neighbors = self.__neighbors
+        supported = self.__supported
+        marks = self.__marks
+        self.__update += 1
+        update = self.__update
+        invalid = self.__invalid
+        stack = self.__stack
+        for first, second in edges:
+            if distances[first] == distances[second] + 1 and marks[first] != update and not supported (first):
+                marks[first] = update
+                invalid.append (first)
+                stack.append (first)
+            if distances[second] == distances[first] + 1 and marks[second] != update and not supported (second):
+                marks[second] = update
+                invalid.append (second)
+                stack.append (second)
+        while stack:
+            index = stack.pop()
+            for neighbor in openNeighbors (index, neighbors):
+                if distances[neighbor] == distances[index] + 1 and marks[neighbor] != update and not supported (neighbor):
+                    marks[neighbor] = update
+                    invalid.append (neighbor)
+                    stack.append (neighbor)
+        size = len (distances)
+        heap = self.__heap
+        for index in invalid:
+            distance = self.unreachable
+            for neighbor in openNeighbors (index, neighbors):
+                if marks[neighbor] != update and distances[neighbor] + 1 < distance:
+                    distance = distances[neighbor] + 1
+            distances[index] = distance
+            if distance < self.unreachable:
+                heappush (heap, distance * size + index)
+        invalid.clear()
+        while heap:
+            key = heappop (heap)
+            distance = key // size
+            index = key - distance * size
+            if distance > distances[index]:
+                continue
+            for neighbor in openNeighbors (index, neighbors):
+                if marks[neighbor] == update and distance + 1 < distances[neighbor]:
+                    distances[neighbor] = distance + 1
+                    heappush (heap, (distance + 1) * size + neighbor)
+
+    def distance (self, cell) -> int:
+        """
+        Returns the number of steps from the cell to the target. if the target can not be reached, returns the unreachable value.
+        """
+        return self.distances[self.board.indexOf (cell)]
+
+    def pathIndexes (self, index: int) -> list:
+        """
+        Build the shortest path from the cell of the given index to the target, by following the cells with the smaller distance.
+        Returns a list of the indexes of the cells, or an empty list if the target can not be reached.
+        """
+        distances = self.distances
+        openNeighbors = self.board.openNeighbors
+        if distances[index] == self.unreachable:
+            return []
+        path = [index]
+        while distances[index]:
+            for neighbor in openNeighbors (index):
+                if distances[neighbor] == distances[index] - 1:
+                    index = neighbor
+                    break
+            path.append (index)
+        return path
+
+    def path (self, cell) -> list:
+        """
+        Same as pathIndexes, but with cells instead of indexes.
+        """
+        cells = self.board.cells
+        return [cells[index] for index in self.pathIndexes (self.board.indexOf (cell))]
+
+class Zobrist:
+    """
+    This class stores the random keys for the Zobrist hashing of the positions of a board size.
+    The hash of a position is the xor of the keys of the blocks on the board, the cells of the players,
+    the number of blocks of every player and the current player.
+    The keys are generated from the size of the board, so they are the same in every process.
+    Attributes:
+        pawns - list of keys for every player (up to 4), by the index of the cell
+        blocks - keys of the blocks, by direction * number of cells + index of the cell (like Board.canPlaceBlock)
+        blocksLeft - list of keys for every player, by the number of blocks
+        sides - keys of the current player
+    """
+    __tables = {}
+
+    def __init__ (self, width: int, height: int):
+        random = Random (f"zobrist {width}x{height}")
+        n = width * height
+        maxBlocks = ((width + 1) * (height + 1)) // 5
+        self.pawns = [[random.getrandbits (64) for index in range (n)] for player in range (4)]
+        self.blocks = [random.getrandbits (64) for index in range (2 * n)]
+        self.blocksLeft = [[random.getrandbits (64) for count in range (maxBlocks + 1)] for player in range (4)]
+        self.sides = [random.getrandbits (64) for player in range (4)]
+
+    @classmethod
+    def forBoard (cls, width: int, height: int):
+        """
+        Returns the keys of a board size. the keys are created only once for every size.
+        """
+        if (width, height) not in cls.__tables:
+            cls.__tables[(width, height)] = cls (width, height)
+        return cls.__tables[(width, height)]
+
 def findPath (player)-> list:
     """
     A function the find the shortest path to win (go to its target) for the player.
-    Use the A* algorithm.
+    The path follows the distance field of the target of the player.
     Returns a list of the cells.
     """
-    startCell = player.cell
-    board = player.game.board
-    target = set (player.target)
-    if startCell in target:
-        return [startCell]
-    visited = set ()
-    q = Queue ()
-    q.put ([startCell])
-    visited.add (startCell)
-
-    while not q.empty():
-        path = q.get()
-        currentCell = path [-1] #the last cell in the current path
-        for direction, cell in currentCell.neighbors().items():
-            if cell in visited or board.blocked (currentCell, direction, 0): #cell already checked or cannot go there, skip the cell
-                continue
-            newPath = path + [cell]
-            if cell in target:
-                return newPath
-            visited.add (cell)
-            q.put (newPath)
-            
-    return []
+    return player.game.board.distanceField (player.targetAsTuple).path (player.cell)
+
+def pathLength (player) -> int:
+    """
+    Returns the length of the shortest path of the player (like len (findPath (player))), without building the path.
+    """
+    field = player.game.board.distanceField (player.targetAsTuple)
+    distance = field.distance (player.cell)
+    if distance == field.unreachable:
+        return 0
+    return distance + 1
         
-def findAction (player):
+def findAction (player, pool = None):
     """
     This function find the best action for a player to do
     based on the score of actions
+    pool is optional ScoringPool. if given, the scores of all the candidates are checked together by its processes,
+    else every score is checked by its action on the game.
     return an Action object
     """
     paths = []
@@ -132,50 +360,42 @@ def findAction (player):
             myPath = path
         else:
             paths.append (path)
-    actions = set()
+    actions = {} # the candidates by their key. the scores are checked only after all the candidates are found
     moveAction = None
 
     # adding the optional actions of moving
     for cell in player.optionalMoves.values():
         newAction = Action (player, "move", cell)
-        actions.add (newAction)
+        actions[newAction.key] = newAction
         if cell == myPath[1]:
             moveAction = newAction # moving to the next cell in shortest path is the default action
     if not moveAction:
-        moveAction = actions.pop() #random element. at the end of the function all the scores will be checked
+        moveAction = next (iter (actions.values())) #at the end of the function all the scores will be checked
 
     if player.blocks:
+        board = player.game.board
+        blocks = [] # tuples of (cell, direction)
         for path in paths: #do this for every other player
             for x in range (len(path)-1): #every cell of the opposing path
                 cell1 = path[x]
                 cell2 = path[x+1]
                 if cell1.x == cell2.x: # the cells are on the same column
-                    direction = 0
-                    if cell1.y > cell2.y:
-                        newAction = Action (player, "block", cell1, direction)
-                    else:
-                        newAction = Action (player, "block", cell2, direction)
-                    if not newAction in actions:
-                        actions.add (newAction)
+                    cell = cell1 if cell1.y > cell2.y else cell2
+                    blocks.append ((cell, 0))
                     if cell1.x > 1: #there is also a possibility to place a block on the cell of the left
-                        newCell = player.game.board.index (cell1.x - 1, newAction.cell.y)
-                        newAction = Action (player, "block", newCell, direction)
-                        if not newAction in actions:
-                            actions.add (newAction)
+                        blocks.append ((board.index (cell1.x - 1, cell.y), 0))
                 else: #the cells are on the same row
-                    direction = 1
-                    if cell1.x > cell2.x:
-                        newAction = Action (player, "block", cell1, direction)
-                    else:
-                        newAction = Action (player, "block", cell2, direction)
-                    if not newAction in actions:
-                        actions.add (newAction)
-                    if cell1.y < player.game.board.height: #there is also a possibility to place a block on the cell of the top
-                        newCell = player.game.board.index (newAction.cell.x, cell1.y + 1)
-                        newAction = Action (player, "block", newCell, direction)
-                        if not newAction in actions:
-                            actions.add (newAction)
-    for action in actions:
+                    cell = cell1 if cell1.x > cell2.x else cell2
+                    blocks.append ((cell, 1))
+                    if cell1.y < board.height: #there is also a possibility to place a block on the cell of the top
+                        blocks.append ((board.index (cell.x, cell1.y + 1), 1))
+        for cell, direction in blocks:
+            key = ("block", direction, cell.x, cell.y)
+            if key not in actions:
+                actions[key] = Action (player, "block", cell, direction)
+    if pool is not None:
+        pool.scoreActions (player, list (actions.values()))
+    for action in actions.values():
         if action.score > moveAction.score:
             moveAction = action
         elif moveAction.score < 0 and moveAction.name == "move" and action.name == "block" and action.score == moveAction.score:
@@ -185,7 +405,8 @@ def findAction (player):
          
     
 if __name__ == "__main__":
-    from game import QuoridorGame, pygame
+    import pygame
+    from game import QuoridorGame
     pygame.init()
     game = QuoridorGame ()
     game.start()
@@ -8,8 +8,12 @@ classes defined here:
     Block - blocks in the board
 """
 
-import pygame
-from ai import findPath, findAction
+from ai import findAction, DistanceField, Zobrist, Action
+from state import GameState
+from search import SearchEngine
+from mcts import MCTSEngine
+from scoring import ScoringPool
+from itertools import count
 import json
 
 class Cell:
@@ -174,41 +178,8 @@ class Block:
         gapSize is for the width of the gap between blocks.
         rotation is for the rotation of the board.
         """
-        c = self.rightCells[0].rect
-        d = self.rightCells[1].rect
-
-        if (self.direction and rotation in (0,180)) or ((not self.direction) and rotation in (90, 270)): # the block is vertical in the surface
-            width = gapSize
-            height = c.height * 2 + gapSize
-        else: #the block is horizontal in the surface
-            width = c.width * 2 + gapSize
-            height = gapSize
-        if rotation:
-            if rotation == 90:
-                if self.direction:
-                    topLeftX = d.left
-                    topLeftY = d.top - gapSize
-                else:
-                    topLeftX = c.left - gapSize
-                    topLeftY = c.top
-            elif rotation == 270:
-                if self.direction:
-                    topLeftX, topLeftY = c.bottomleft
-                else:
-                    topLeftX, topLeftY = d.topright
-            else:
-                if self.direction:
-                    topLeftX, topLeftY = d.topright
-                else:
-                    topLeftX = d.left
-                    topLeftY = d.top - gapSize
-        else:
-            if self.direction:
-                topLeftX = c.left - gapSize
-                topLeftY = c.top
-            else:
-                topLeftX, topLeftY = c.bottomleft
-        self.rect = pygame.draw.rect (surface, (100,100,100), (topLeftX, topLeftY, width, height))
+        from render import drawBlock
+        drawBlock (self, surface, gapSize, rotation)
  
 
 class Board:
@@ -216,44 +187,65 @@ class Board:
     This is the class for the board of the game.
     a board contains multiple cells and can contain blocks. the players are not linked to the board.
     Attribute:
+        number - a serial number of the board, different for every board that is created (the boards of different games are different)
         height, width - the height and width of the board (number of cells).
+        cells - list of all the cells, bottom row first, from left to right. cell (x, y) is at index (y-1) * width + (x-1).
         first - first cell of the board (bottom left).
         blocks - list of the blocks in the board (Block instance).
+        __wallUnder, __wallLeft - edge index of the blocks. for every cell (by the cells order), 1 if a block is under / on the left of the cell, else 0.
+        __fields - dict of the DistanceField instances of the board, by their target.
+        zobristHash - the xor of the Zobrist keys of the blocks on the board. updated every time a block is added or removed.
+        __slots - occupancy grid of the slots for blocks, indexed by [direction][index of the cell]. 0 if a block can be placed in the slot,
+            else the number of reasons that forbid it (a block in the slot, an overlapping or crossing block, or the edge of the board).
         currentGap - Gap instance. used to display on the screen.
+        cellGap - the gap between the cells in pixels, in the last drawing of the board.
+        layer - the render.BoardLayer of the last drawing: the pre-rendered grid and the rects of the cells. None if not drawn.
         __rotation - current rotation of the board on the screen. default value is 0.
         __bottomLeft - current bottom left cell on the screen.
     """
     cellColor = (255,127,36)
+    numbers = count (1) # the serial numbers of the boards
     def __init__(self, width: int, height:  int=-1):
         """
         Initialize the board, based on the given width and height. if height is not given or lower than 0, the height will like the width.
         """
+        self.number = next (Board.numbers)
         self.width = width
         if height < 0:
             self.height = width
         else:
             self.height = height
 
-        self.first = Cell (1, 1)
-        temp = self.first
-        bottom = temp
+        self.cells = []
         for y in range (self.height):
             for x in range (self.width):
-                if x==0 and y==0:
-                    continue
                 newCell = Cell (x+1, y+1)
-                temp.next = newCell
+                if self.cells:
+                    self.cells[-1].next = newCell
                 if x > 0:
                     #use the setter of the right cell
-                    temp.right = newCell
-                temp = newCell
+                    self.cells[-1].right = newCell
                 if y > 0:
                     #use the setter of the top cell
-                    bottom.top = newCell
-                    bottom = bottom.next
+                    self.cells[-self.width].top = newCell
+                self.cells.append (newCell)
+        self.first = self.cells[0]
 
         self.blocks = []
+        self.__wallUnder = bytearray (len (self))
+        self.__wallLeft = bytearray (len (self))
+        self.__fields = {}
+        self.__zobrist = Zobrist.forBoard (self.width, self.height)
+        self.zobristHash = 0
+        self.__slots = (bytearray (len (self)), bytearray (len (self)))
+        for index, cell in enumerate (self.cells): # the slots on the edges of the board are always forbidden
+            if cell.y == 1 or cell.x == self.width:
+                self.__slots[0][index] = 1
+            if cell.y == 1 or cell.x == 1:
+                self.__slots[1][index] = 1
         self.currentGap = None
+        self.cellGap = 5
+        self.layer = None
         self.__rotation = 0
         self.__bottomLeft = self.first
 
@@ -262,11 +254,7 @@ class Board:
         Iterates all the cell in the board.
         bottom row first, from left to right. and then go up.
         """
-        current = self.first
-        yield current
-        while current.next != None:
-            yield current.next
-            current = current.next
+        return iter (self.cells)
 
     def __len__(self):
         """
@@ -287,25 +275,16 @@ class Board:
         """
         This method returns an generator of a specific row of the board.
         """
-        current = self.first
-        for i in range (index - 1):
-            current = current.top
-        yield current
-        while current.right != None:
-            yield current.right
-            current = current.right
+        if 0 < index <= self.height:
+            start = (index - 1) * self.width
+            yield from self.cells[start:start + self.width]
 
     def getCol (self, index: int):
         """
         This method returns an generator of a specific column of the board.
         """
-        current = self.first
-        for i in range (index - 1):
-            current = current.right
-        yield current
-        while current.top != None:
-            yield current.top
-            current = current.top
+        if 0 < index <= self.width:
+            yield from self.cells[index - 1::self.width]
 
     @property
     def rows (self):
@@ -325,21 +304,20 @@ class Board:
 
     def __getitem__(self, index) -> Cell:
         """
-        the board is indexed by the same order of the iter function
+        the board is indexed by the same order of the iter function.
+        can also be indexed by a tuple (x, y), like the index method.
         """
-        current = self.first
-        for i in range (index):
-            current = current.next
-        return current
+        if isinstance (index, tuple):
+            return self.index (*index)
+        return self.cells[index]
 
     def index (self, x: int, y: int) -> Cell:
         """
         This methods returns a cell by the given x and y coordinates. (x=1 is the left, y=1 is the bottom).
         If coordinates does not exists, returns None.
         """
-        for cell in self.getCol (x):
-            if cell.y == y:
-                return cell
+        if 0 < x <= self.width and 0 < y <= self.height:
+            return self.cells[(y - 1) * self.width + x - 1]
         return None
 
     @property
@@ -365,6 +343,12 @@ class Board:
         else:
             raise ValueError ("Illegal rotation.")
         
+    def indexOf (self, cell: Cell) -> int:
+        """
+        Returns the index of the cell in the board (the index of the cells list).
+        """
+        return (cell.y - 1) * self.width + cell.x - 1
+
     def blocked (self, cell: Cell, direction: str, boardRotation: int=1) -> bool:
         """
         This method checks if a given cell is blocked in a specific direction.
@@ -373,19 +357,73 @@ class Board:
         """
         if boardRotation == 1:
             boardRotation = self.__rotation
-        nextCell = cell.neighbors(direction, boardRotation)
-        if nextCell is None:
-            return True # the cell is blocked in that direction because there is no cell there
-        rotation = direction in (self.absoluteDirection ("top", boardRotation), self.absoluteDirection ("bottom", boardRotation)) # if vertical, rotation is True
-        for block in self.blocks:
-            if not block.direction == rotation: # if the direction is the same of the block direction, the block can not block the direction
-                if direction in (self.absoluteDirection ("top", boardRotation), self.absoluteDirection ("right", boardRotation)):
-                    if cell not in block.rightCells and nextCell in block.rightCells:
-                        return True
-                else:
-                    if cell in block.rightCells and nextCell not in block.rightCells:
-                        return True
-        return False
+        direction = self.directionsDict[-boardRotation % 360].get (direction) # the absolute direction
+        index = self.indexOf (cell)
+        if direction == "top":
+            return cell.y >= self.height or bool (self.__wallUnder[index + self.width])
+        if direction == "bottom":
+            return cell.y <= 1 or bool (self.__wallUnder[index])
+        if direction == "right":
+            return cell.x >= self.width or bool (self.__wallLeft[index + 1])
+        if direction == "left":
+            return cell.x <= 1 or bool (self.__wallLeft[index])
+        return True # there is no cell in that direction
+
+    def openNeighbors (self, index: int, neighbors: list = None) -> list:
+        """
+        This method returns the indexes of the cells that can be reached in one step from the cell of the given index.
+        The directions are absolute and the order is top, right, bottom, left. players are not checked.
+        If a list of neighbors is given, it is cleared and filled instead of a new list (the distance fields reuse their lists).
+        """
+        width = self.width
+        if neighbors is None:
+            neighbors = []
+        else:
+            neighbors.clear()
+        if index + width < len (self.cells) and not self.__wallUnder[index + width]:
+            neighbors.append (index + width)
+        if (index + 1) % width and not self.__wallLeft[index + 1]:
+            neighbors.append (index + 1)
+        if index >= width and not self.__wallUnder[index]:
+            neighbors.append (index - width)
+        if index % width and not self.__wallLeft[index]:
+            neighbors.append (index - 1)
+        return neighbors
+
+    def __markBlock (self, block: Block, step: int):
+        """
+        Update the edge index, the hash, the distance fields and the slots grid for the cells of the block.
+        step is 1 if the block is added, -1 if removed.
+        """
+        walls = self.__wallLeft if block.direction else self.__wallUnder
+        edges = []
+        for cell in block.rightCells:
+            index = self.indexOf (cell)
+            walls[index] += step
+            edges.append ((index, index - 1 if block.direction else index - self.width))
+        self.zobristHash ^= self.__zobrist.blocks[block.direction * len (self) + self.indexOf (block.rightCells[0])]
+        for field in self.__fields.values():
+            if step > 0:
+                field.edgesRemoved (edges)
+            else:
+                field.edgesAdded (edges)
+        x, y = block.rightCells[0].coord
+        if block.direction:
+            forbidden = ((1, x, y - 1), (1, x, y), (1, x, y + 1), (0, x - 1, y))
+        else:
+            forbidden = ((0, x - 1, y), (0, x, y), (0, x + 1, y), (1, x + 1, y))
+        for direction, slotX, slotY in forbidden:
+            if 0 < slotX <= self.width and 0 < slotY <= self.height:
+                self.__slots[direction][(slotY - 1) * self.width + slotX - 1] += step
+
+    def distanceField (self, target: tuple) -> DistanceField:
+        """
+        Returns the DistanceField of the given target (like Player.targetAsTuple).
+        The field is created at the first time, and then updated every time a block is added or removed.
+        """
+        if target not in self.__fields:
+            self.__fields[target] = DistanceField (self, target)
+        return self.__fields[target]
 
     def canPlaceBlock (self, direction: int, cell: Cell) -> Block:
         """
@@ -395,36 +433,34 @@ class Board:
             cell - if horizontal, the cell that is on top left of the gap. if vertical, top right.
             returns a Block instance if can be placed, else None.
         """
-        if direction: #vertical
-            for block in self.blocks: # check if there is already a block in this place
-                if block.direction:
-                    if cell in block.rightCells or cell.bottom in block.rightCells:
-                        return None
-                else:
-                    if cell == block.rightCells[1]:
-                        return None
-            try:
+        try:
+            if self.__slots[1 if direction else 0][self.indexOf (cell)]:
+                return None # there is already a block in this place, or the block will cross another block
+            if direction: #vertical
                 return Block (cell, cell.bottom)
-            except Exception:
-                return None
-        else: #horizontal
-            for block in self.blocks: # check if there is already a block in this place
-                if not block.direction:
-                    if cell in block.rightCells or cell.right in block.rightCells:
-                        return None
-                else:
-                    if cell.right == block.rightCells[0]:
-                        return None
-            try:
-                return Block (cell, cell.right)
-            except Exception:
-                return None
+            return Block (cell, cell.right) #horizontal
+        except Exception:
+            return None
+
+    def legalWallSlots (self):
+        """
+        This method returns a generator of all the slots where a block can be placed, as tuples (direction, cell).
+        The arguments are the same as the canPlaceBlock method.
+        If the board already contains the maximum number of blocks, there are no slots.
+        The paths of the players are not checked.
+        """
+        if len (self.blocks) < self.MAX_BLOCKS:
+            for direction, slots in enumerate (self.__slots):
+                for index, cell in enumerate (self.cells):
+                    if not slots[index]:
+                        yield direction, cell
                     
-    def addBlock (self, direction, cellX: int, cellY: int):
+    def addBlock (self, direction, cellX: int, cellY: int, players: list = None):
         """
             This function add a block to the board.
             direction can be a string or an integer (horizontal=0, vertical=1).
             cellX and cellY are the coordinates of the right cell relative to the block.
+            players is optional. if given, the block is added only if it does not block the way of one of the players (see wouldDisconnect).
             returns the new block if success, else returns None.
         """
         if len(self.blocks) < self.MAX_BLOCKS:
@@ -439,7 +475,10 @@ class Board:
                         raise ValueError("Illegal direction")
                 newBlock = self.canPlaceBlock (direction, cell)
                 if newBlock:
+                    if players and self.wouldDisconnect (direction, cell, players):
+                        return None
                     self.blocks.append (newBlock)
+                    self.__markBlock (newBlock, 1)
                     return newBlock
                 else:
                     raise Exception ("There is already a block here")
@@ -448,92 +487,73 @@ class Board:
         else:
             return None
 
+    def wouldDisconnect (self, direction: int, cell: Cell, players: list) -> bool:
+        """
+        This method checks if a block in a specific place will block the way of one of the players to its target.
+        The arguments direction and cell are the same as the canPlaceBlock method. The block is not added to the board.
+        If the block is not on a shortest path to the target of a player, the player is skipped without a search.
+        Else, the way is searched from the cell of the player, trying first the cells that were nearer to the target before the block.
+        so if the block does not cross the current shortest path of the player, the search only follows this path.
+        Returns True if one of the players can not reach its target, else False.
+        """
+        index = self.indexOf (cell)
+        if direction:
+            edges = {(index, index - 1), (index - self.width, index - self.width - 1)}
+        else:
+            edges = {(index, index - self.width), (index + 1, index + 1 - self.width)}
+        edges |= {(second, first) for first, second in edges}
+        for player in players:
+            field = self.distanceField (player.targetAsTuple)
+            distances = field.distances
+            start = self.indexOf (player.cell)
+            if distances[start] == field.unreachable:
+                return True
+            if all (distances[first] == distances[second] for first, second in edges):
+                continue # the block is not on any shortest path to this target
+            visited = bytearray (len (self))
+            visited[start] = 1
+            stack = [start]
+            while stack:
+                current = stack.pop()
+                if not distances[current]: # the target is reached
+                    break
+                nearer = []
+                for neighbor in self.openNeighbors (current):
+                    if not visited[neighbor] and (current, neighbor) not in edges:
+                        visited[neighbor] = 1
+                        if distances[neighbor] < distances[current]:
+                            nearer.append (neighbor)
+                        else:
+                            stack.append (neighbor)
+                stack += nearer # the nearer cells are checked first
+            else:
+                return True
+        return False
+
+    def popBlock (self, index: int = -1) -> Block:
+        """
+        Remove a block from the board. by default, the last added block.
+        Returns the removed block.
+        """
+        block = self.blocks.pop (index)
+        self.__markBlock (block, -1)
+        return block
+
     def draw (self, surface, cellSize: int, cellGap: int = 5):
         """
         This method draw the board on a specific surface.
         cellSize is the number of pixels of the cell, rotation of the board and cellGap is the gap between cells in pixels.
         """
-        #Calculate the size of the board
-        width = cellGap * (self.width+1) + cellSize * self.width
-        height = cellGap * (self.height+1) + cellSize * self.height
-
-        #Center of the window
-        center = surface.get_rect().center
-
-        #Top-Left corner of the board
-        leftX = center[0] - width // 2
-        topY = center[1] - height // 2
-        #draw the board
-        self.rect = pygame.draw.rect (surface, Board.cellColor, (leftX, topY, width, height))
-        pygame.draw.rect (surface, (0,0,0), self.rect, 1)
-
-        rotation = self.__rotation
-        if rotation:
-            if rotation == 90:
-                self.__bottomLeft = self.index (self.width, 1)
-                x = leftX + cellGap
-                y = topY #start from the top left
-                for cell in self:
-                    y += cellGap
-                    cell.rect = pygame.draw.rect (surface, (0,0,0), (x, y, cellSize, cellSize), 1)
-                    if cell.x == self.width:
-                        #Pass line
-                        x += (cellSize + cellGap)
-                        y = topY
-                    else:
-                        #Stay in the same line
-                        y += cellSize
-            elif rotation == 270:
-                self.__bottomLeft = self.index (1, self.height)
-                x = leftX + width - cellGap - cellSize
-                y = topY + height - cellSize #start from the bottom right
-                for cell in self:
-                    y -= cellGap
-                    cell.rect = pygame.draw.rect (surface, (0,0,0), (x, y, cellSize, cellSize), 1)
-                    if cell.x == self.width:
-                        #Pass line
-                        x -= (cellSize + cellGap)
-                        y = topY + height - cellSize
-                    else:
-                        #Stay in the same line
-                        y -= cellSize
-            else:
-                self.__bottomLeft = self.index (self.width, self.height)
-                x = leftX + width - cellSize
-                y = topY + cellGap #start from the top right
-                for cell in self:
-                    x -= cellGap
-                    cell.rect = pygame.draw.rect (surface, (0,0,0), (x, y, cellSize, cellSize), 1)
-                    if cell.x == self.width:
-                        #Pass line
-                        x = leftX + width - cellSize
-                        y += (cellSize + cellGap)
-                    else:
-                        #Stay in the same line
-                        x -= cellSize
-        else:
-            self.__bottomLeft = self.first
-            x = leftX
-            y = topY + height - cellGap - cellSize #start from the bottom left
-            for cell in self:
-                x += cellGap
-                cell.rect = pygame.draw.rect (surface, (0,0,0), (x, y, cellSize, cellSize), 1)
-                if cell.x == self.width:
-                    #Pass line
-                    x = leftX
-                    y -= (cellSize + cellGap)
-                else:
-                    #Stay in the same line
-                    x += cellSize
-
-        for block in self.blocks:
-            block.draw (surface, cellGap, self.__rotation)
+        from render import drawBoard
+        self.cellGap = cellGap
+        self.__bottomLeft = drawBoard (self, surface, cellSize, cellGap)
 
     def erase (self):
         """
         Erase the board from the surface.
         """
         self.rect = None
+        self.layer = None
         for cell in self:
             cell.rect = None
         for block in self.blocks:
@@ -564,39 +584,25 @@ class Board:
         This method calculates what element on the board in a specific pixel.
         Will return a Gap object if the pixel is inside a gap between cells.
         in all other cases, will return None.
+        The gap is computed from the grid of the last drawing (see render.BoardLayer.gapAt), without walking on the cells.
         """
         from guiutil import Gap
-        if self.rect: #check if the board is displayed
+        if self.rect and self.layer: #check if the board is displayed
             if self.rect.collidepoint(x,y): #check if the pixel is inside of the board
-                try:
-                    temp = self.__bottomLeft
-                    while temp: #find the column that is in right of the gap
-                        if temp.rect.right < x:
-                            temp = temp.neighbors ("right", self.__rotation)
-                        elif temp.rect.right == x:
-                            return None
-                        else:
-                            break
-                    while temp: #find the cell on top of the gap
-                        if temp.rect.top > y:
-                            temp = temp.neighbors ("top", self.__rotation)
-                        elif temp.rect.top == y:
-                            return None
-                        else:
-                            break
-                    if temp.rect.bottom < y: #the gap is horizontal. x value was increased and we need to return over the gap
-                        if not temp.neighbors ("bottom", self.__rotation): #the gap is under the first line
-                            return None
-                        direction = 0
-                    elif temp.rect.bottom == y:
-                        return None
-                    else: #the gap is vertical
-                        direction = 1
-                    if temp.rect.collidepoint (x,y): #the pixel is inside of a cell
-                        return None
-                    return Gap(direction, temp, self.__rotation)
-                except AttributeError:
-                    return None 
+                gap = self.layer.gapAt (x, y)
+                if gap:
+                    direction, index = gap
+                    return Gap(direction, self.cells[index], self.__rotation)
+        return None
+
+    def getCellByPixel (self, x: int, y: int) -> Cell:
+        """
+        Returns the cell that contains the pixel in the last drawing of the board, or None.
+        """
+        if self.layer:
+            index = self.layer.cellAt (x, y)
+            if index is not None:
+                return self.cells[index]
         return None
 
     def getNextGap (self, direction):
@@ -811,11 +817,7 @@ class Player:
         Return True if success, else False.
         """
         if self.blocks:
-            if self.game.board.addBlock (direction, cell.x, cell.y):
-                for player in self.game.players:
-                    if not findPath (player):
-                        self.game.board.blocks.pop()
-                        return False
+            if self.game.board.addBlock (direction, cell.x, cell.y, self.game.players):
                 self.blocks -= 1
                 return True
         return False
@@ -846,6 +848,7 @@ class Player:
             cell = options[direction]
             player = self.game.playerInCell (cell)
             if player:
+                diagonal = None
                 options[direction] = cell.neighbors (direction, self.rotation) # jump over the player
                 if options[direction]:
                     if blocked (cell, direction) or self.game.playerInCell (options[direction]):
@@ -858,7 +861,7 @@ class Player:
                     for d in list(diagonal):
                         if blocked (cell, d) or self.game.playerInCell (diagonal[d]) or diagonal[d] is None:
                             diagonal.pop (d)
-                if "diagonal" in locals():
+                if diagonal is not None:
                     if diagonal:
                         if len (diagonal) > 1:
                             options.pop (direction)
@@ -878,29 +881,135 @@ class Player:
         """
         Draw the player on the screen.
         """
-        try:
-            currentCell = self.cell.rect
-            radius = currentCell.width * (3/8)
-            self.rect = pygame.draw.circle(self.game.window, self.color, currentCell.center, radius)
-            rect = self.game.board.rect
-            dictionnary = {
-                0: (rect.left, rect.top - 2, rect.width, 2),
-                90: (rect.left - 2, rect.top, 2, rect.height),
-                180: (*rect.bottomleft, rect.width, 2),
-                270: (*rect.topright, 2, rect.height)
-                }
-            pygame.draw.rect(self.game.window, self.color, dictionnary[(self.rotation - self.game.currentPlayer.rotation) % 360])
-        except AttributeError:
-            print (f"Can't draw {self.name} player.")
+        from render import drawPlayer
+        drawPlayer (self)
 
 class AIPlayer (Player):
+    """
+    Class for AI player. This class inherit from Player.
+    Added attributes:
+        engine - the way to find the action. "greedy" for findAction, "alphabeta" for SearchEngine, "mcts" for MCTSEngine.
+        timeLimit - seconds for every action of the alphabeta and mcts engines.
+        maxNodes - optional limit of nodes for every action of the alphabeta engine.
+        tableSize - megabytes of the transposition table of the alphabeta engine.
+        iterations - optional limit of rollouts for every action of the mcts engine.
+        workers - number of processes for the rollouts of the mcts engine. None for the number of the CPUs.
+                  the greedy engine checks the scores in a ScoringPool only if more than 1 worker is given.
+        searchEngine - the engine of the player, kept between the actions to keep its transposition table or its tree.
+        ponder - True if the player searches its moves for the likely replies of a human player during the turn of the human (see worker.Ponderer).
+        ponderer - the Ponderer of the player, created at the first pondering.
+    """
+    def __init__(self, name: str, color: str, startPosition: tuple, engine: str = "greedy", timeLimit: float = 1.0, maxNodes: int = None,
+                 tableSize: float = 16, iterations: int = None, workers: int = None, ponder: bool = False):
+        super().__init__(name, color, startPosition)
+        self.engine = engine
+        self.timeLimit = timeLimit
+        self.maxNodes = maxNodes
+        self.tableSize = tableSize
+        self.iterations = iterations
+        self.workers = workers
+        self.searchEngine = None
+        self.ponder = ponder
+        self.ponderer = None
+
     @property
     def isAi (self):
         """ override isAi property """
         return True
     
+    def newEngine (self):
+        """
+        Returns a new engine by the settings of the player. None for the greedy engine without a ScoringPool.
+        """
+        if self.engine == "mcts":
+            return MCTSEngine (self.timeLimit, self.iterations, self.workers)
+        if self.engine == "alphabeta":
+            return SearchEngine (self.timeLimit, self.maxNodes, tableSize=self.tableSize)
+        if self.workers and self.workers > 1:
+            return ScoringPool (self.workers)
+        return None
+
+    def __engine (self):
+        """
+        Returns the engine of the player, created at the first time.
+        """
+        if self.searchEngine is None:
+            self.searchEngine = self.newEngine()
+        return self.searchEngine
+
+    def chooseAction (self):
+        """
+        Find the action of the player by its engine, without executing it.
+        If the position was found by the pondering, the action is taken from the ponderer.
+        Returns an Action object.
+        """
+        move = self.__pondered (self.game.zobristHash)
+        if move is not None:
+            return Action.fromMove (self, move)
+        engine = self.__engine()
+        if engine is not None:
+            return engine.findAction (self)
+        return findAction (self)
+
+    def chooseMove (self, state, stop = None) -> int:
+        """
+        Find the move of the player in a GameState of the position of its game (a snapshot), without using the game,
+        so the game can be displayed by another thread meanwhile. the state must not be used by the game.
+        If the position was found by the pondering, the move is taken from the ponderer.
+        stop is an optional threading.Event that stops the search of the alphabeta and mcts engines (see SearchEngine.search).
+        Returns a move of GameState, or None if the search is stopped before it finds a move.
+        """
+        move = self.__pondered (state.hash)
+        if move is not None:
+            return move
+        return self.findMove (state, stop)
+
+    def findMove (self, state, stop = None, engine = None) -> int:
+        """
+        Search the move of the player in a GameState, like chooseMove but without the pondering.
+        The search is done by the engine of the player, unless another engine is given (like the engine of the Ponderer).
+        """
+        if engine is None:
+            engine = self.__engine()
+        if self.engine in ("alphabeta", "mcts"):
+            return engine.search (state, stop)
+        game = state.toGame() # a new game of the position, for findAction
+        player = game.currentPlayer
+        action = engine.findAction (player) if engine is not None else findAction (player)
+        move = game.board.indexOf (action.cell)
+        if action.name == "block":
+            move += (action.direction + 1) * len (game.board)
+        return move
+
+    def startPondering (self):
+        """
+        Start the pondering in the position of the game, that must be the turn of another player.
+        """
+        if self.ponderer is None:
+            from worker import Ponderer
+            self.ponderer = Ponderer (self)
+        self.ponderer.start (GameState.fromGame (self.game), self.game.players.index (self))
+
+    def stopPondering (self):
+        """
+        Stop the pondering. the thread of the pondering ends in the background.
+        """
+        if self.ponderer is not None:
+            self.ponderer.stop()
+
+    def __pondered (self, key: int) -> int:
+        """
+        Stop the pondering, and returns the move that was found for the position of the hash, or None.
+        """
+        if self.ponderer is None:
+            return None
+        self.ponderer.stop()
+        return self.ponderer.take (key)
+
     def autoAction (self):
-        action = findAction (self)
+        action = self.chooseAction()
+        if self.searchEngine is not None:
+            print (self.searchEngine)
         action ()
         print (action)
         
@@ -934,6 +1043,14 @@ class QuoridorGame:
             "players": ["Player 1", "Player 2"],
             "players-colors": {2:["red", "blue"], 4:["red", "green", "blue", "gold"]},
             "ai-players" : [],
+            "ai-engine": "greedy",
+            "ai-time-limit": 1.0,
+            "ai-max-nodes": None,
+            "ai-table-size": 16,
+            "ai-iterations": None,
+            "ai-workers": None,
+            "ai-ponder": False,
+            "ai-configs": {},
             "board-width":9,
             "board-height":9,
             "button-color": "green4",
@@ -970,6 +1087,18 @@ class QuoridorGame:
             "current-player": self.currentPlayer.name
         }
         
+    @property
+    def zobristHash (self) -> int:
+        """
+        The Zobrist hash of the current position: the blocks on the board, the cells and the blocks of the players and the current player.
+        It is the same as the hash of a GameState of the same position.
+        """
+        keys = Zobrist.forBoard (self.board.width, self.board.height)
+        value = self.board.zobristHash ^ keys.sides[self.players.index (self.currentPlayer)]
+        for side, player in enumerate (self.players):
+            value ^= keys.pawns[side][self.board.indexOf (player.cell)] ^ keys.blocksLeft[side][player.blocks]
+        return value
+
     def setup (self, **kwargs):
         """
         This method takes key-word arguments and updates the corresponding setting.
@@ -983,6 +1112,8 @@ class QuoridorGame:
         """
         w, h = self.settings ["board-width"], self.settings ["board-height"]
         playersNum = len (self.settings["players"])
+        if playersNum not in (2, 4):
+            raise ValueError ("The game must have 2 or 4 players.")
         if playersNum == 2:
             position = ((w // 2 + 1, 1), (w // 2 + 1, h))
             rotations = (0,180)
@@ -993,14 +1124,86 @@ class QuoridorGame:
             rotations = (0,90,180,270)
         self.board = Board(w, h)
         for index, player in enumerate (self.settings["players"]):
-            if player in self.settings["ai-players"]:
-                newPlayer = AIPlayer(player, self.settings["players-colors"][playersNum][index], position[index])
-            else:
-                newPlayer = Player(player, self.settings["players-colors"][playersNum][index], position[index])
+            newPlayer = self.__newPlayer (player, self.settings["players-colors"][playersNum][index], position[index])
             newPlayer.game = self
             newPlayer.rotation = rotations[index]
         self.currentPlayer = self.players[0]
         self.winner = None # if a winner already stored, delete it
+        self.__ponder()
+
+    def __newPlayer (self, name: str, color: str, position: tuple) -> Player:
+        """
+        Create a player by the settings: an AIPlayer with the AI settings if its name is in the ai-players setting, else a Player.
+        """
+        if name in self.settings["ai-players"]:
+            config = {
+                "engine": self.settings["ai-engine"],
+                "timeLimit": self.settings["ai-time-limit"],
+                "maxNodes": self.settings["ai-max-nodes"],
+                "tableSize": self.settings["ai-table-size"],
+                "iterations": self.settings["ai-iterations"],
+                "workers": self.settings["ai-workers"],
+                "ponder": self.settings["ai-ponder"]
+                }
+            config.update (self.settings["ai-configs"].get (name, {})) # the settings of this AI player
+            return AIPlayer(name, color, position, **config)
+        return Player(name, color, position)
+
+    def load (self, status):
+        """
+        Restore a running game from a status (a dict or a json string, like the status method).
+        The board, the players with their cells, blocks, targets and rotations, and the current player are built directly from the status.
+        The status is trusted: the blocks are placed without checking the paths of the players.
+        The AI players get the AI settings of the game, and the other settings are kept.
+        Raises ValueError if the status is not a legal status of a running game.
+        """
+        if isinstance (status, str):
+            status = json.loads (status)
+        if not status.get ("running"):
+            raise ValueError ("The status is not of a running game.")
+        if self.running:
+            self.over()
+        try:
+            w, h = status["board-width"], status["board-height"]
+            players = status["players"]
+            if len (players) not in (2, 4):
+                raise ValueError ("The game must have 2 or 4 players.")
+            # the start position and the rotation of a player by its target, the same as the start method
+            layout = {("y", h): ((w // 2 + 1, 1), 0), ("x", 1): ((w, h // 2 + 1), 90),
+                      ("y", 1): ((w // 2 + 1, h), 180), ("x", w): ((1, h // 2 + 1), 270)}
+            self.setup (board_width=w, board_height=h, players=[player["name"] for player in players],
+                        ai_players=[player["name"] for player in players if player.get ("isAI")])
+            self.board = Board (w, h)
+            for data in players:
+                axis, value = data["target"].split()
+                position, rotation = layout[("x" if axis == "column" else "y", int (value))]
+                player = self.__newPlayer (data["name"], data["color"], position)
+                player.game = self
+                player.rotation = rotation
+                player.x, player.y = data["x"], data["y"]
+                player.blocks = data["blocks"]
+            for block in status["blocks"]:
+                cell = block["cells"][0]
+                if self.board.addBlock (block["direction"], cell["x"], cell["y"]) is None:
+                    raise ValueError (f"Illegal block {block}")
+            self.currentPlayer = next (player for player in self.players if player.name == status["current-player"])
+        except (ValueError, KeyError, TypeError, AttributeError, StopIteration) as error:
+            self.over()
+            raise ValueError (f"Illegal status: {error}")
+        self.currentPlayer.currentAction = "move"
+        self.board.rotation = self.currentPlayer.rotation
+        self.winner = None
+        self.__ponder()
+
+    @classmethod
+    def fromStatus (cls, status, **settings):
+        """
+        Create a game from a status (see the load method). the settings are set before, like the setup method.
+        """
+        game = cls()
+        game.setup (**settings)
+        game.load (status)
+        return game
 
     @property
     def running (self) -> bool:
@@ -1024,6 +1227,8 @@ class QuoridorGame:
         self.board = None
         self.currentPlayer = None
         for player in list(self.players):
+            if player.isAi:
+                player.stopPondering()
             player.game = None
 
     def nextPlayer (self):
@@ -1041,6 +1246,16 @@ class QuoridorGame:
                 self.currentPlayer = self.players[index + 1]
             self.currentPlayer.currentAction = "move"
             self.board.rotation = self.currentPlayer.rotation
+            self.__ponder()
+
+    def __ponder (self):
+        """
+        If the current player is a human player, the AI players that ponder search their replies while the human player thinks.
+        """
+        if not self.currentPlayer.isAi:
+            for player in self.players:
+                if player.isAi and player.ponder:
+                    player.startPondering()
 
     def playerInCell (self, cell: Cell) -> Player:
         """
@@ -1058,45 +1273,19 @@ class QuoridorGame:
         This method display the game on the screen based on the given width and height.
         resizable - a bool.
         """
-        if not self.displayed:
-            pygame.init()
-            pygame.display.set_caption ("Quoridor Game")
-            try:
-                gameIcon = pygame.image.load ("media/quoridor.ico")
-                pygame.display.set_icon (gameIcon)
-            except FileNotFoundError:
-                print("Default icon loaded")
-            print ("Game Displayed")
-        if resizable:
-            self.window = pygame.display.set_mode ((width, height), pygame.RESIZABLE)
-        else:
-            self.window = pygame.display.set_mode ((width, height))
+        from render import openWindow # the display is loaded only when needed
+        openWindow (self, width, height, resizable)
         self.draw()
 
-    def draw (self):
+    def draw (self, full: bool = False):
         """
         If the game is displayed, draw the current state of the game in the game window.
+        Only the changes since the last drawing are drawn, unless full is True (see render.drawGame).
         If not, raises an Exception.
         """
         if self.displayed:
-            if not self.running:
-                self.window.fill ((0,0,0))
-                image = pygame.image.load ("media/quoridor.jpg")
-                image.set_alpha (128)
-                image = pygame.transform.scale (image, self.window.get_size())
-                self.window.blit (image, (0,0))
-            else:
-                self.window.fill (self.settings["background-color"])
-                width, height = self.window.get_size()
-                cellSize = min (width, height) // (1.6 * max (self.board.width, self.board.height))
-                self.board.draw (self.window, cellSize)
-                for player in self.players:
-                    player.draw()
-            for text in self.texts:
-                text.draw(self.window)
-            for button in self.buttons:
-                button.draw(self.window)
-            pygame.display.update()
+            from render import drawGame
+            drawGame (self, full)
         else:
             raise Exception ("Game is not displayed")
 
@@ -1105,7 +1294,8 @@ class QuoridorGame:
         close the game window. this method does not stop the game itself.
         """
         try:
-            pygame.quit()
+            from render import closeWindow
+            closeWindow()
             print ("Window closed")
         except Exception:
             print ("Game window is not displayed")
@@ -1132,6 +1322,8 @@ class QuoridorGame:
             self.close()
                 
 if __name__ == "__main__":
+    from time import sleep
+
     def error (msg):
         print (f"[ERROR]:: {msg}")
         
@@ -1196,7 +1388,6 @@ if __name__ == "__main__":
                 error (f"Command \"{cmd}\" require 0 arguments but {n} are given. Type \"help\" for more information.")
             else:
                 if game.displayed:
-                    pygame.event.pump()
                     game.close()
                 else:
                     error ("Game is not displayed!")
@@ -1254,7 +1445,6 @@ if __name__ == "__main__":
                 error (f"Command \"{cmd}\" require 0 arguments but {n} are given. Type \"help\" for more information.")
             else:
                 if game.displayed:
-                    pygame.event.pump()
                     game.close()
                 break
         else:
@@ -1263,7 +1453,7 @@ if __name__ == "__main__":
             #the AI player will play and than go to the next player
             if game.displayed:
                 #display the current stat, and wait a second until the AI player will play
-                pygame.time.delay (1000)
+                sleep (1)
             game.currentPlayer.autoAction ()
             game.nextPlayer()
             if game.displayed:
@@ -1275,4 +1465,5 @@ if __name__ == "__main__":
         print ()
         line = input ("Command >> ")
         if game.displayed:
-            pygame.event.pump()
\ No newline at end of file
+            from render import pumpEvents
+            pumpEvents()
\ No newline at end of file
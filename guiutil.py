@@ -1,11 +1,35 @@
 """
 This module is for all the GUI custom elements of the game.
 Include Text, Button, Gap and msgBox.
+The fonts, the rendered texts and the images of the buttons are cached, because the texts are drawn again in every drawing of the game.
 """
 import pygame
-from tkinter import Tk
+from render import markDirty
 
-pygame.init()
+fonts = {} # the fonts by (name, size)
+textImages = {} # the rendered texts by (text, font name, size, color)
+buttonImages = {} # the images of the buttons by the name of the file in the media folder, None if there is no such file
+MAX_TEXT_IMAGES = 512
+
+def getFont (name: str, size: int) -> pygame.font.Font:
+    """
+    Returns the system font of the name and the size. the font is loaded only at the first time.
+    """
+    if not pygame.font.get_init(): # pygame is initialized only when a game is displayed
+        pygame.font.init()
+        fonts.clear()
+    key = (name, size)
+    if key not in fonts:
+        fonts[key] = pygame.font.SysFont (name, size)
+    return fonts[key]
+
+def clearCaches ():
+    """
+    Clear the caches of the fonts and the images. used when pygame is closed, because its fonts can not be used after it.
+    """
+    fonts.clear()
+    textImages.clear()
+    buttonImages.clear()
 
 class Text:
     """
@@ -43,8 +67,15 @@ class Text:
     def img (self) -> pygame.Surface:
         """
         Returns a pygame.Surface object that is the surface of the text.
+        The surface is rendered only if the text, the font, the size or the color changed since the last time.
         """
-        return pygame.font.SysFont (self.fontName, self.size).render (self.text, 1, self.textColor)
+        key = (self.text, self.fontName, self.size, self.textColor)
+        image = textImages.get (key)
+        if image is None:
+            if len (textImages) >= MAX_TEXT_IMAGES:
+                textImages.clear()
+            image = textImages[key] = getFont (self.fontName, self.size).render (self.text, 1, self.textColor)
+        return image
 
     @property
     def rect (self) -> pygame.Rect:
@@ -77,8 +108,10 @@ class Text:
         Draw the text on the surface.
         """
         self.updateProps (surface)
-        pygame.draw.rect (surface, self.color, self.rect)
-        surface.blit (self.img, self.rect.topleft)
+        rect = self.rect
+        pygame.draw.rect (surface, self.color, rect)
+        surface.blit (self.img, rect.topleft)
+        markDirty (rect)
 
 class Button (Text):
     """
@@ -104,16 +137,19 @@ class Button (Text):
     @property
     def img (self):
         """
-        Override the img method.
+        Override the img method. the image of the file is loaded only at the first time.
         """
-        try:
-            return pygame.image.load ("media/" + self.text)
-        except FileNotFoundError:
-            return super().img
+        if self.text not in buttonImages:
+            try:
+                buttonImages[self.text] = pygame.image.load ("media/" + self.text)
+            except FileNotFoundError:
+                buttonImages[self.text] = None
+        return buttonImages[self.text] or super().img
 
     @property
     def rect (self):
-        return pygame.Rect(self.x - 10, self.y - 10, self.img.get_width() + 20, self.img.get_height() + 20)
+        width, height = self.img.get_size()
+        return pygame.Rect(self.x - 10, self.y - 10, width + 20, height + 20)
     
     def action (self):
         """
@@ -126,8 +162,10 @@ class Button (Text):
         There are two differences: the border radius and the position of the text (x and y instead of the rect)
         """
         self.updateProps (surface)
-        pygame.draw.rect (surface, self.color, self.rect, border_radius = 5)
+        rect = self.rect
+        pygame.draw.rect (surface, self.color, rect, border_radius = 5)
         surface.blit (self.img, (self.x, self.y))
+        markDirty (rect)
 
     def click (self) -> bool:
         """
@@ -224,6 +262,7 @@ def msgBox (func, *args, **kwargs):
     This function draw a message box on the screen.
     func - can be any tkinter message box function, with its args and kwargs.
     """
+    from tkinter import Tk
     win = Tk()
     win.withdraw()
     answer = func (*args, **kwargs)
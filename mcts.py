@@ -0,0 +1,298 @@
+"""
+This module is for the Monte Carlo tree search of the AI.
+Include rollout - play a game to the end with a fast policy that follows the shortest paths,
+Node - a node of the search tree,
+and MCTSEngine - a tree search with UCT selection, that runs the rollouts in a pool of processes.
+"""
+import os
+from math import log, sqrt
+from random import Random
+from time import perf_counter
+from concurrent.futures import ProcessPoolExecutor
+from ai import Action
+from state import GameState
+
+def rollout (state: GameState, random: Random, maxMoves: int = None, blockRate: float = 0.25, greedyRate: float = 0.9) -> int:
+    """
+    Play the game of the state to the end. the state is changed.
+    Every player moves along its shortest path (like findPath), sometimes blocks the path of the nearest other player
+    when this player is nearer to its target, and sometimes plays a random move.
+    If the game does not end after maxMoves moves, the player with the shortest path wins.
+    By default, maxMoves is 6 moves for every player: the short rollouts are more accurate with the same time.
+    Returns the side of the winner.
+    """
+    players = len (state.pawns)
+    if maxMoves is None:
+        maxMoves = 6 * players
+    for count in range (maxMoves):
+        side = state.side
+        played = False
+        if state.blocks[side] and random.random() < blockRate:
+            other = min ((other for other in range (players) if other != side), key=state.distance)
+            if state.distance (other) < state.distance (side):
+                candidates = state.blocksOnPath (state.path (other)[:3])
+                random.shuffle (candidates)
+                for move in candidates:
+                    if state.apply (move):
+                        played = True
+                        break
+        if not played:
+            moves = state.pawnMoves()
+            if not moves: # the player can not move
+                break
+            if random.random() < greedyRate:
+                distances = state.fields[side].distances
+                nearest = min (distances[move] for move in moves)
+                moves = [move for move in moves if distances[move] == nearest]
+            state.apply (random.choice (moves))
+            if state.reached (side):
+                return side
+    return min (range (players), key=state.distance)
+
+def rolloutBatch (state: GameState, lines: list, seed: int) -> list:
+    """
+    Play a rollout after every line of moves from the state. used by the processes of the pool.
+    The state is sent once for the batch, and the moves of every rollout are undone after it, so the state is not copied.
+    Returns a list of the sides of the winners.
+    """
+    random = Random (seed)
+    historyLength = len (state.history)
+    winners = []
+    for line in lines:
+        for move in line:
+            state.apply (move)
+        winners.append (rollout (state, random))
+        while len (state.history) > historyLength:
+            state.undo()
+    return winners
+
+class Node:
+    """
+    A node of the search tree.
+    Attributes:
+        move - the move of GameState that leads to the node. None for the root.
+        side - the side of the player that played the move
+        parent - the parent Node. None for the root.
+        hash - the Zobrist hash of the position of the node
+        children - list of the expanded children
+        untried - list of the moves that are not expanded yet. None until the node is visited.
+        visits - the number of rollouts through the node
+        wins - the number of these rollouts that the player of the side won
+        winner - the side of the winner if the move ends the game, else None
+    """
+    def __init__ (self, move: int, side: int, parent, hash: int):
+        self.move = move
+        self.side = side
+        self.parent = parent
+        self.hash = hash
+        self.children = []
+        self.untried = None
+        self.visits = 0
+        self.wins = 0
+        self.winner = None
+
+    def __len__ (self):
+        """
+        len function returns the number of nodes in the tree of the node.
+        """
+        return 1 + sum (len (child) for child in self.children)
+
+    def uct (self, exploration: float) -> float:
+        """
+        The UCT value of the node, for the selection by its parent.
+        """
+        return self.wins / self.visits + exploration * sqrt (log (self.parent.visits) / self.visits)
+
+class MCTSEngine:
+    """
+    Monte Carlo tree search engine for the AI players.
+    Every iteration selects a node by UCT, expands one of its moves and plays a rollout from the new position.
+    The rollouts are played in batches: the nodes of a batch are selected with a virtual loss
+    (their visits are counted before the result), and the rollouts are sent to a pool of processes.
+    The moves of a node are the moves of the player and the blocks on the shortest paths of the other players.
+    The tree is kept after the search, and it is used again if the next position is in the tree.
+    Attributes:
+        timeLimit - seconds for a search. None for no limit.
+        iterations - number of rollouts for a search. None for no limit.
+        workers - number of processes for the rollouts. 1 to play the rollouts in this process.
+        exploration - the exploration constant of UCT
+        rollouts - the number of rollouts of the last search
+        reused - the number of visits of the tree that is kept from the last search
+        elapsed - the seconds of the last search
+    """
+    def __init__ (self, timeLimit: float = 1.0, iterations: int = None, workers: int = None, exploration: float = 1.4, seed: int = None):
+        """
+        If no workers given, uses the number of the CPUs.
+        """
+        if timeLimit is None and iterations is None:
+            raise ValueError ("MCTSEngine needs a time limit or a number of iterations.")
+        self.timeLimit = timeLimit
+        self.iterations = iterations
+        self.workers = workers or os.cpu_count() or 1
+        self.exploration = exploration
+        self.rollouts = 0
+        self.reused = 0
+        self.elapsed = 0
+        self.__random = Random (seed)
+        self.__pool = None
+        self.__root = None
+
+    @property
+    def rolloutsPerSecond (self) -> float:
+        if self.elapsed:
+            return self.rollouts / self.elapsed
+        return 0.0
+
+    def __repr__ (self):
+        best = self.__root # the chosen move of the last search
+        winRate = f", win rate {best.wins / best.visits:.0%}" if best and best.visits else ""
+        return f"MCTS: {self.rollouts} rollouts in {self.elapsed:.2f}s ({self.rolloutsPerSecond:.0f} rollouts/s), {self.reused} reused{winRate}"
+
+    def close (self):
+        """
+        Shut down the pool of processes.
+        """
+        if self.__pool is not None:
+            self.__pool.shutdown()
+            self.__pool = None
+
+    def findAction (self, player) -> Action:
+        """
+        Search the best action for the player, that must be the current player of its game.
+        Returns an Action object.
+        """
+        return Action.fromMove (player, self.search (GameState.fromGame (player.game)))
+
+    def search (self, state: GameState, stop = None) -> int:
+        """
+        Search the best move for the side of the state until the time or the iterations are over.
+        stop is an optional threading.Event of the search: if it is set by another thread, the search stops like at the end of the time.
+        Returns the move of the most visited child of the root. If no move was expanded (the player has no forward move and no block
+        on a path), returns a legal move of the state, or None if the side of the state has no legal move.
+        """
+        start = perf_counter()
+        root = self.__reuse (state)
+        self.reused = root.visits
+        self.rollouts = 0
+        batchSize = self.workers * 8 if self.workers > 1 else 8
+        try:
+            while True:
+                if self.iterations is not None and self.rollouts >= self.iterations:
+                    break
+                if self.timeLimit is not None and self.rollouts and perf_counter() - start >= self.timeLimit:
+                    break
+                if stop is not None and stop.is_set() and self.rollouts:
+                    break
+                if self.iterations is not None:
+                    batchSize = min (batchSize, self.iterations - self.rollouts)
+                self.__runBatch (state, root, batchSize)
+                if len (root.children) <= 1 and not root.untried: # only one move, or none
+                    break
+        finally:
+            self.elapsed = perf_counter() - start
+        if not root.children:
+            self.__root = None
+            moves = state.legalMoves()
+            return moves[0] if moves else None
+        best = max (root.children, key=lambda child: child.visits)
+        best.parent.children = [best] # the other moves are not played
+        self.__root = best
+        return best.move
+
+    def __reuse (self, state: GameState) -> Node:
+        """
+        Returns the node of the position of the state in the tree of the last search, or a new root.
+        The node is searched in the moves of the other players after the last move.
+        """
+        node = self.__root
+        if node is not None:
+            level = [node]
+            for depth in range (len (state.pawns)):
+                for candidate in level:
+                    if candidate.hash == state.hash:
+                        candidate.parent = None
+                        candidate.move = None
+                        return candidate
+                level = [child for candidate in level for child in candidate.children]
+        return Node (None, (state.side - 1) % len (state.pawns), None, state.hash)
+
+    def __candidates (self, state: GameState) -> list:
+        """
+        Returns the moves to expand for the side of the state. the forward moves of the player are expanded first.
+        """
+        side = state.side
+        distances = state.fields[side].distances
+        moves = sorted (state.pawnMoves(), key=distances.__getitem__, reverse=True)
+        if state.blocks[side]:
+            seen = set (moves)
+            for other in range (len (state.pawns)):
+                if other != side:
+                    for move in state.blocksOnPath (state.path (other)):
+                        if move not in seen:
+                            seen.add (move)
+                            moves.insert (0, move)
+        return moves
+
+    def __select (self, state: GameState, root: Node) -> list:
+        """
+        Select a node by UCT and expand it. the moves of the path are played on the state.
+        Returns the path of the nodes from the root.
+        """
+        node = root
+        path = [root]
+        while node.winner is None:
+            if node.untried is None:
+                node.untried = self.__candidates (state)
+            if node.untried:
+                move = node.untried.pop()
+                side = state.side
+                if not state.apply (move):
+                    continue
+                child = Node (move, side, node, state.hash)
+                if state.reached (side):
+                    child.winner = side
+                node.children.append (child)
+                path.append (child)
+                break
+            if not node.children:
+                break
+            node = max (node.children, key=lambda child: child.uct (self.exploration))
+            state.apply (node.move)
+            path.append (node)
+        return path
+
+    def __runBatch (self, state: GameState, root: Node, size: int):
+        """
+        Select the nodes of a batch, play the rollouts and update the nodes.
+        """
+        paths = []
+        lines = []
+        results = []
+        for count in range (size):
+            path = self.__select (state, root)
+            for node in path: # virtual loss until the result
+                node.visits += 1
+            leaf = path[-1]
+            if leaf.winner is not None:
+                results.append ((path, leaf.winner))
+            else:
+                paths.append (path)
+                lines.append ([node.move for node in path[1:]])
+            for node in path[1:]:
+                state.undo()
+        if lines:
+            if self.workers > 1:
+                if self.__pool is None:
+                    self.__pool = ProcessPoolExecutor (self.workers)
+                chunk = -(-len (lines) // self.workers)
+                futures = [self.__pool.submit (rolloutBatch, state, lines[index:index + chunk], self.__random.getrandbits (32))
+                           for index in range (0, len (lines), chunk)]
+                winners = [winner for future in futures for winner in future.result()]
+            else:
+                winners = rolloutBatch (state, lines, self.__random.getrandbits (32))
+            results += zip (paths, winners)
+        for path, winner in results:
+            for node in path:
+                if node.side == winner:
+                    node.wins += 1
+        self.rollouts += size
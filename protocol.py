@@ -0,0 +1,176 @@
+"""
+This module is for driving the AI from another process, by a line protocol over stdin and stdout (like UCI in chess).
+Every command is one line, and every answer is one or more lines that are flushed immediately.
+The moves and the positions are written in the notation of GameState, like "e2", "e3h" and "9x9/e1,e9/10,10/-/0".
+
+Commands:
+    quoridor - answers "id name Quoridor" and "quoridorok"
+    isready - answers "readyok"
+    newgame [size] [players] - set the position of a new game (default: 9 and 2 players). the size is from 3 to 26 (the letters of the notation).
+    position <position> [moves <move> ...] - set a position and play moves from it. "startpos" is the position of a new game.
+    moves <move> ... - play moves from the current position
+    go [engine greedy|alphabeta|mcts] [movetime <ms>] [nodes <n>] [iterations <n>] - search the best move of the current player.
+        answers "info ..." and "bestmove <move>" (or "bestmove none" if the game is over or the player has no move). the move is not played.
+        the greedy engine has no limits: movetime, nodes and iterations are errors with it.
+    legal - answers "legal <move> ..." with all the legal moves of the current player
+    d - answers "position <position>" and "winner <side>" if the game is over
+    quit - stop the engine
+An error answers "error <message>", and the engine continues.
+"""
+import sys
+from time import perf_counter
+from ai import findAction
+from state import GameState
+from search import SearchEngine
+from mcts import MCTSEngine
+
+MIN_SIZE = 3
+MAX_SIZE = 26 # the columns of the notation are letters
+
+class EngineProtocol:
+    """
+    The engine of the protocol. the engines of the search are kept between the commands, with their tables and trees.
+    Attributes:
+        state - the GameState of the current position
+        engine - the default engine of go
+        running - False after the quit command
+        __game - a QuoridorGame for findAction. the position is written to it only for the greedy engine.
+        __engines - the SearchEngine and MCTSEngine, by their names
+    """
+    def __init__ (self, engine: str = "greedy"):
+        self.state = GameState.initial()
+        self.engine = engine
+        self.running = True
+        self.__game = None
+        self.__engines = {}
+
+    def handle (self, line: str) -> list:
+        """
+        Execute a command and returns the lines of the answer.
+        """
+        words = line.split()
+        if not words:
+            return []
+        command, args = words[0].lower(), words[1:]
+        try:
+            if command == "quoridor":
+                return ["id name Quoridor", "quoridorok"]
+            if command == "isready":
+                return ["readyok"]
+            if command == "newgame":
+                size = int (args[0]) if args else 9
+                if not MIN_SIZE <= size <= MAX_SIZE:
+                    raise ValueError (f"the size must be from {MIN_SIZE} to {MAX_SIZE}")
+                self.state = GameState.initial (size, size, int (args[1]) if len (args) > 1 else 2)
+                return []
+            if command == "position":
+                return self.__position (args)
+            if command == "moves":
+                self.__play (args)
+                return []
+            if command == "go":
+                return self.__go (args)
+            if command == "legal":
+                return ["legal " + " ".join (self.state.notation (move) for move in self.state.legalMoves())]
+            if command == "d":
+                answer = [f"position {self.state}"]
+                if self.state.winner is not None:
+                    answer.append (f"winner {self.state.winner}")
+                return answer
+            if command == "quit":
+                self.running = False
+                return []
+            return [f"error unknown command {command}"]
+        except (ValueError, IndexError) as error:
+            return [f"error {error}"]
+
+    def __position (self, args: list) -> list:
+        """
+        The position command.
+        """
+        if not args:
+            raise ValueError ("position needs a position")
+        if args[0].lower() == "startpos":
+            state = GameState.initial (self.state.width, self.state.height, len (self.state.pawns))
+        else:
+            state = GameState.fromString (args[0])
+        if len (args) > 1:
+            if args[1].lower() != "moves":
+                raise ValueError (f"unknown argument {args[1]}")
+        self.state = state
+        self.__play (args[2:])
+        return []
+
+    def __play (self, moves: list):
+        """
+        Play the moves on the current position. if a move is illegal, the moves before it are played.
+        """
+        for text in moves:
+            if self.state.winner is not None:
+                raise ValueError ("the game is over")
+            move = self.state.parseMove (text)
+            if not self.state.isLegal (move):
+                raise ValueError (f"illegal move {text}")
+            self.state.apply (move)
+
+    def __go (self, args: list) -> list:
+        """
+        The go command.
+        """
+        options = dict (zip (args[::2], args[1::2]))
+        engine = options.get ("engine", self.engine)
+        limit = {"alphabeta": "nodes", "mcts": "iterations"}.get (engine) # the other limit of the engine
+        if engine == "greedy" and options.keys() & {"movetime", "nodes", "iterations"}:
+            raise ValueError ("the greedy engine has no limits")
+        if "movetime" in options:
+            timeLimit = int (options["movetime"]) / 1000
+        else:
+            timeLimit = None if limit in options else 1.0
+        if self.state.winner is not None:
+            return ["bestmove none"]
+        start = perf_counter()
+        if engine == "greedy":
+            self.__game = self.state.toGame (self.__game if self.__matches (self.__game) else None)
+            action = findAction (self.__game.currentPlayer)
+            move = self.__game.board.indexOf (action.cell)
+            if action.name == "block":
+                move += (action.direction + 1) * len (self.state)
+            info = f"info engine greedy score {action.score}"
+        elif engine in ("alphabeta", "mcts"):
+            if engine == "alphabeta":
+                searchEngine = self.__engines.setdefault (engine, SearchEngine())
+                searchEngine.maxNodes = int (options["nodes"]) if "nodes" in options else None
+            else:
+                searchEngine = self.__engines.setdefault (engine, MCTSEngine (workers=1))
+                searchEngine.iterations = int (options["iterations"]) if "iterations" in options else None
+            searchEngine.timeLimit = timeLimit
+            move = searchEngine.search (self.state)
+            if engine == "alphabeta":
+                info = f"info engine alphabeta depth {searchEngine.depth} score {searchEngine.score} nodes {searchEngine.nodes}"
+            else:
+                info = f"info engine mcts rollouts {searchEngine.rollouts} reused {searchEngine.reused}"
+        else:
+            raise ValueError (f"unknown engine {engine}")
+        bestmove = "none" if move is None else self.state.notation (move) # a side that has no move
+        return [f"{info} time {round ((perf_counter() - start) * 1000)}", f"bestmove {bestmove}"]
+
+    def __matches (self, game) -> bool:
+        """
+        Check if the game can get the current position by GameState.toGame.
+        """
+        return (game is not None and (game.board.width, game.board.height) == (self.state.width, self.state.height)
+                and len (game.players) == len (self.state.pawns))
+
+    def run (self, input = sys.stdin, output = sys.stdout):
+        """
+        Read the commands from the input until quit or the end of the input, and write the answers to the output.
+        """
+        for line in input:
+            for answer in self.handle (line):
+                output.write (answer + "\n")
+            output.flush()
+            if not self.running:
+                break
+
+if __name__ == "__main__":
+    EngineProtocol().run()
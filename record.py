@@ -0,0 +1,302 @@
+"""
+This module is for the records of games: the position of the start and the moves, without the board and the players.
+Include GameRecord - the record of one game, that can be written as text or as packed binary and replayed by GameState,
+RecordWriter - write the records to a file while the games are played,
+and readRecords - a generator of the records of a file, that reads one record at a time.
+
+The text of a record is one line: the position of the start (like str of GameState) and the moves in the notation of GameState,
+like "9x9/e1,e9/10,10/-/0 e2 e8 e3h".
+A binary file starts with MAGIC, and every record is:
+    a header of 5 bytes - the width, the height, the number of players (1 byte each) and the length of the text of the start position
+    (2 bytes, 0 for the start of a new game), then the text of the start position,
+    the moves of GameState - 1 byte for every move if 3 * cells < 255 (every board up to 9x9), else 2 bytes,
+    and an end mark - 255 or 65535.
+"""
+import struct
+from state import GameState
+
+MAGIC = b"QRC1" # the start of a binary file of records
+HEADER = struct.Struct (">BBBH")
+
+class GameRecord:
+    """
+    The record of a game.
+    Attributes:
+        width, height - the size of the board
+        players - the number of players
+        start - the text of the position of the start, or None for the start of a new game
+        moves - list of the moves of GameState
+    """
+    def __init__ (self, width: int = 9, height: int = 9, players: int = 2, start: str = None, moves: list = None):
+        self.width = width
+        self.height = height
+        self.players = players
+        self.start = start
+        self.moves = list (moves or [])
+
+    @classmethod
+    def fromState (cls, state: GameState):
+        """
+        Create an empty record that starts from the position of the state.
+        """
+        start = str (state)
+        if start == str (GameState.initial (state.width, state.height, len (state.pawns))):
+            start = None
+        return cls (state.width, state.height, len (state.pawns), start)
+
+    def __repr__ (self):
+        return f"GameRecord: {self.width}x{self.height}, {self.players} players, {len (self.moves)} moves"
+
+    def __len__ (self):
+        """
+        len function returns the number of moves.
+        """
+        return len (self.moves)
+
+    def __eq__ (self, other) -> bool:
+        try:
+            return ((self.width, self.height, self.players, self.start, self.moves)
+                    == (other.width, other.height, other.players, other.start, other.moves))
+        except AttributeError:
+            return False
+
+    @property
+    def moveSize (self) -> int:
+        """
+        The number of bytes of a move in the binary of the record.
+        """
+        return moveSize (self.width, self.height)
+
+    def append (self, move: int):
+        """
+        Add a move of GameState to the record.
+        """
+        self.moves.append (move)
+
+    def initialState (self) -> GameState:
+        """
+        Returns a new GameState of the position of the start.
+        """
+        if self.start is None:
+            return GameState.initial (self.width, self.height, self.players)
+        return GameState.fromString (self.start)
+
+    def positions (self):
+        """
+        Generator of the positions of the game: yields the move and the state after the move, for every move.
+        The same state is changed by every move, so it must be copied to be kept.
+        Raises ValueError if a block of the record is illegal.
+        """
+        state = self.initialState()
+        for move in self.moves:
+            if not state.apply (move):
+                raise ValueError (f"Illegal move in the record: {state.notation (move)}")
+            yield move, state
+
+    def replay (self, ply: int = None) -> GameState:
+        """
+        Returns the GameState after the first ply moves of the record (after all the moves if ply is None).
+        The moves are played by GameState.apply, without the board and the players of QuoridorGame.
+        """
+        state = self.initialState()
+        for move in self.moves[:ply]:
+            if not state.apply (move):
+                raise ValueError (f"Illegal move in the record: {state.notation (move)}")
+        return state
+
+    @property
+    def winner (self) -> int:
+        """
+        The side of the winner at the end of the record, or None.
+        """
+        return self.replay().winner
+
+    def toText (self) -> str:
+        """
+        Returns the text of the record, without a new line.
+        """
+        state = self.initialState()
+        return " ".join ([str (state)] + [state.notation (move) for move in self.moves])
+
+    @classmethod
+    def fromText (cls, text: str):
+        """
+        Create a record from its text.
+        Raises ValueError if the text is not a legal record.
+        """
+        words = text.split()
+        if not words:
+            raise ValueError ("Empty record")
+        state = GameState.fromString (words[0])
+        record = cls.fromState (state)
+        record.moves = [state.parseMove (word) for word in words[1:]]
+        return record
+
+    def header (self) -> bytes:
+        """
+        Returns the binary of the start of the record, before the moves.
+        Raises ValueError if the record can not be written in the binary format.
+        """
+        start = (self.start or "").encode ("ascii")
+        if max (self.width, self.height, self.players) > 255 or len (start) > 65535:
+            raise ValueError (f"The record is too big for the binary format: {self}")
+        return HEADER.pack (self.width, self.height, self.players, len (start)) + start
+
+    def toBytes (self) -> bytes:
+        """
+        Returns the binary of the record, with the end mark.
+        """
+        return self.header() + packMoves (self.moves + [endMark (self.moveSize)], self.moveSize)
+
+    @classmethod
+    def read (cls, file):
+        """
+        Read the binary of a record from a file opened in binary mode.
+        Returns the record, or None at the end of the file.
+        Raises ValueError if the record is not complete.
+        """
+        header = file.read (HEADER.size)
+        if not header:
+            return None
+        if len (header) < HEADER.size:
+            raise ValueError ("Incomplete record")
+        width, height, players, length = HEADER.unpack (header)
+        record = cls (width, height, players, file.read (length).decode ("ascii") if length else None)
+        size = record.moveSize
+        end = packMoves ([endMark (size)], size)
+        data = bytearray()
+        while True:
+            chunk = file.read (size)
+            if len (chunk) < size:
+                raise ValueError ("Incomplete record")
+            if chunk == end:
+                break
+            data += chunk
+        record.moves = unpackMoves (data, size)
+        return record
+
+def moveSize (width: int, height: int) -> int:
+    """
+    Returns the number of bytes of a move of a board size in the binary of a record.
+    """
+    return 1 if 3 * width * height < 255 else 2
+
+def endMark (size: int) -> int:
+    return 255 if size == 1 else 65535
+
+def packMoves (moves: list, size: int) -> bytes:
+    if size == 1:
+        return bytes (moves)
+    return struct.pack (f">{len (moves)}H", *moves)
+
+def unpackMoves (data: bytes, size: int) -> list:
+    if size == 1:
+        return list (data)
+    return list (struct.unpack (f">{len (data) // 2}H", data))
+
+class RecordWriter:
+    """
+    Write records to a file. A record can be written at once (write), or move by move while the game is played (begin, move, end).
+    Attributes:
+        binary - True for the binary records, False for the text records
+        record - the GameRecord of the game that is written now, or None
+        __state - the GameState of the start of the current record, for the notation of the moves
+        __file - the file of the records
+    """
+    def __init__ (self, path: str, binary: bool = False, append: bool = False):
+        """
+        Open the file of the records. If append is True, the records are added to the end of the file.
+        Raises ValueError if the records are added to a file that is not a binary file of records.
+        """
+        self.binary = binary
+        self.record = None
+        self.__state = None
+        self.__file = open (path, ("a" if append else "w") + ("b" if binary else ""), **({} if binary else {"encoding": "ascii"}))
+        if binary and self.__file.tell() == 0:
+            self.__file.write (MAGIC)
+        elif binary:
+            with open (path, "rb") as file:
+                magic = file.read (len (MAGIC))
+            if magic != MAGIC:
+                self.__file.close()
+                raise ValueError (f"Can not add records to {path}: it is not a binary file of records")
+
+    def __enter__ (self):
+        return self
+
+    def __exit__ (self, *args):
+        self.close()
+
+    def close (self):
+        """
+        End the record of the current game and close the file.
+        """
+        if self.record is not None:
+            self.end()
+        self.__file.close()
+
+    def begin (self, state: GameState):
+        """
+        Start the record of a new game from the position of the state.
+        """
+        if self.record is not None:
+            self.end()
+        self.record = GameRecord.fromState (state)
+        self.__state = self.record.initialState()
+        if self.binary:
+            self.__file.write (self.record.header())
+        else:
+            self.__file.write (self.record.toText())
+
+    def move (self, move: int):
+        """
+        Add a move of GameState to the record of the current game.
+        """
+        if self.record is None:
+            raise ValueError ("No game is recorded.")
+        self.record.append (move)
+        if self.binary:
+            self.__file.write (packMoves ([move], self.record.moveSize))
+        else:
+            self.__file.write (" " + self.__state.notation (move))
+
+    def end (self):
+        """
+        End the record of the current game. the file is flushed, so the records that are ended can be read by other processes.
+        """
+        if self.record is None:
+            return
+        if self.binary:
+            self.__file.write (packMoves ([endMark (self.record.moveSize)], self.record.moveSize))
+        else:
+            self.__file.write ("\n")
+        self.__file.flush()
+        self.record = None
+        self.__state = None
+
+    def write (self, record: GameRecord):
+        """
+        Write a complete record.
+        """
+        if self.record is not None:
+            self.end()
+        self.__file.write (record.toBytes() if self.binary else record.toText() + "\n")
+
+def readRecords (path: str):
+    """
+    Generator of the records of a file, text or binary. the records are read one by one, so the file is never loaded at once.
+    Raises ValueError if a record is not legal.
+    """
+    with open (path, "rb") as file:
+        if file.read (len (MAGIC)) == MAGIC:
+            while True:
+                record = GameRecord.read (file)
+                if record is None:
+                    break
+                yield record
+        else:
+            file.seek (0)
+            for line in file:
+                line = line.decode ("ascii").strip()
+                if line:
+                    yield GameRecord.fromText (line)
@@ -0,0 +1,361 @@
+"""
+This module is for drawing the game on the screen with pygame.
+The game itself (game.py) does not import pygame. this module is imported only when a game is displayed,
+and the draw methods of the elements of the game call its functions.
+Include openWindow, closeWindow, pumpEvents, drawGame, drawBoardAndPlayers, drawBoard, drawBlock and drawPlayer,
+and the dirty areas: markDirty and updateDisplay update only the areas of the window that changed, instead of the whole window.
+"""
+import pygame
+
+dirtyRects = [] # the areas of the window that changed since the last update of the display
+lastFrame = None # the Frame of the last drawing of a game. there is only one window
+
+class Frame:
+    """
+    What was drawn in the window for a game, to find what changed since then.
+    Attributes:
+        layout - everything that needs a full drawing if changed: the size of the window, the board (and its players) and the buttons
+        rotation - the rotation of the board. if only the rotation changed, only the board is drawn again (from its BoardLayer)
+        cells - list of the cells of the players, by the order of the players
+        blocks - the number of the blocks on the board
+        texts - list of tuples (the key of the text, its rect) of the texts and the buttons of the game
+    """
+    def __init__ (self, game):
+        board = game.board if game.running else None
+        # the board and the players of a game are created together, so the number of the board stands for both of them.
+        # (the id of an object that was freed can be the id of a new one, so the board of a new game must not be found by its id)
+        self.layout = (game.window.get_size(), board.number if board else None, tuple (id (element) for element in game.buttons + game.texts))
+        self.rotation = board.rotation if board else None
+        self.cells = [player.cell for player in game.players] if board else []
+        self.blocks = len (board.blocks) if board else 0
+        self.texts = [(textKey (text), text.rect) for text in game.texts + game.buttons]
+
+def textKey (text) -> tuple:
+    """
+    Returns the values that are drawn by a Text or a Button.
+    """
+    return (text.text, text.textColor, text.color, text.fontName, text.relX, text.relY, text.relH)
+
+def markDirty (rect):
+    """
+    Add an area of the window that changed, to be updated by updateDisplay.
+    """
+    if rect:
+        dirtyRects.append (pygame.Rect (rect))
+
+def updateDisplay (full: bool = False):
+    """
+    Update the areas of the window that changed on the screen. if full is True, the whole window is updated.
+    """
+    if full:
+        pygame.display.update()
+    elif dirtyRects:
+        pygame.display.update (dirtyRects)
+    dirtyRects.clear()
+
+def openWindow (game, width: int, height: int, resizable: bool = False):
+    """
+    Open the window of the game (or change its size), and set it as the window of the game.
+    """
+    global lastFrame
+    lastFrame = None # the new window is drawn from the start
+    if not game.displayed:
+        pygame.init()
+        pygame.display.set_caption ("Quoridor Game")
+        try:
+            gameIcon = pygame.image.load ("media/quoridor.ico")
+            pygame.display.set_icon (gameIcon)
+        except FileNotFoundError:
+            print("Default icon loaded")
+        print ("Game Displayed")
+    if resizable:
+        game.window = pygame.display.set_mode ((width, height), pygame.RESIZABLE)
+    else:
+        game.window = pygame.display.set_mode ((width, height))
+
+def closeWindow ():
+    """
+    Close the window of the game.
+    """
+    global lastFrame
+    from guiutil import clearCaches # guiutil imports this module
+    lastFrame = None
+    dirtyRects.clear()
+    clearCaches()
+    pygame.event.pump()
+    pygame.quit()
+
+def pumpEvents ():
+    """
+    Process the events of the window, so the window keeps responding while the game waits for something else.
+    """
+    pygame.event.pump()
+
+def drawGame (game, full: bool = False):
+    """
+    Draw the current state of a displayed game in its window.
+    If the window, the board, the players and the buttons are the same as in the last drawing,
+    only the changes are drawn: the cells that a player left or entered, the new blocks and the changed texts.
+    If the board is rotated (at every turn), only the area of the board is drawn again, from the BoardLayer of the new rotation.
+    Else, or if full is True, the whole window is drawn again.
+    """
+    global lastFrame
+    frame = Frame (game)
+    if not full and lastFrame is not None and lastFrame.layout == frame.layout and lastFrame.blocks <= frame.blocks:
+        drawChanges (game, lastFrame, frame)
+        lastFrame = frame
+        return
+    if not game.running:
+        game.window.fill ((0,0,0))
+        image = pygame.image.load ("media/quoridor.jpg")
+        image.set_alpha (128)
+        image = pygame.transform.scale (image, game.window.get_size())
+        game.window.blit (image, (0,0))
+    else:
+        game.window.fill (game.settings["background-color"])
+        drawBoardAndPlayers (game)
+    for text in game.texts:
+        text.draw(game.window)
+    for button in game.buttons:
+        button.draw(game.window)
+    lastFrame = Frame (game)
+    updateDisplay (True)
+
+def drawBoardAndPlayers (game):
+    """
+    Draw the board of a running game with its blocks and its players, in the size of the window.
+    """
+    width, height = game.window.get_size()
+    cellSize = min (width, height) // (1.6 * max (game.board.width, game.board.height))
+    game.board.draw (game.window, cellSize)
+    for player in game.players:
+        player.draw()
+
+def drawChanges (game, previous: Frame, frame: Frame):
+    """
+    Draw only what changed since the previous frame, and update only these areas of the window.
+    """
+    window = game.window
+    if game.running and previous.rotation != frame.rotation:
+        drawBoardAndPlayers (game)
+        markDirty (game.board.rect)
+    elif game.running:
+        board = game.board
+        cells = {cell for old, new in zip (previous.cells, frame.cells) if old != new for cell in (old, new)}
+        for cell in cells:
+            board.layer.restore (window, cell.rect)
+            markDirty (cell.rect)
+        for block in board.blocks[previous.blocks:]:
+            drawBlock (block, window, board.cellGap, board.rotation)
+            markDirty (block.rect)
+        for player in game.players:
+            if player.cell in cells:
+                player.draw()
+    for text, (key, rect), (newKey, newRect) in zip (game.texts + game.buttons, previous.texts, frame.texts):
+        if key != newKey:
+            window.fill (game.settings["background-color"], rect)
+            markDirty (rect)
+            text.draw (window)
+    updateDisplay()
+
+class BoardLayer:
+    """
+    The pre-rendered grid of a board for a size of surface, a size of cells, a rotation and a gap between cells.
+    The grid changes only when the window is resized or the board is rotated, so it is computed once and blitted in every drawing.
+    Attributes:
+        rect - the rect of the board in the surface
+        cells - list of the rects of the cells, by the order of the cells of the board
+        bottomLeft - the index of the cell in the bottom left of the surface
+        surface - pygame.Surface of the board with the borders of the cells, without blocks and players
+        columns, rows - the number of the columns and the rows of cells on the surface (by the rotation)
+        left, top - the left of the first column and the top of the bottom row on the surface, in pixels
+        cellSize, step - the size of a cell, and the distance between two cells in pixels
+        __board - the width, the height and the rotation of the board
+    """
+    def __init__ (self, board, surfaceSize: tuple, cellSize: int, cellGap: int):
+        #Calculate the size of the board
+        width = cellGap * (board.width+1) + cellSize * board.width
+        height = cellGap * (board.height+1) + cellSize * board.height
+        #Top-Left corner of the board, in the center of the surface
+        leftX = surfaceSize[0] // 2 - width // 2
+        topY = surfaceSize[1] // 2 - height // 2
+        self.rect = pygame.Rect (leftX, topY, width, height)
+
+        #the cells are placed from the bottom left of the board by the rotation (the bottom left of the surface is the cell of bottomLeft)
+        rotation = board.rotation
+        step = cellSize + cellGap
+        near = cellGap # the distance of the first cell from the side of the board
+        far = cellGap + cellSize # the distance of the beginning of the last cell from the other side
+        self.cells = []
+        for index in range (len (board)):
+            column, row = index % board.width, index // board.width
+            if rotation == 90:
+                x, y = leftX + near + row * step, topY + near + column * step
+            elif rotation == 180:
+                x, y = leftX + width - far - column * step, topY + near + row * step
+            elif rotation == 270:
+                x, y = leftX + width - far - row * step, topY + height - far - column * step
+            else:
+                x, y = leftX + near + column * step, topY + height - far - row * step
+            self.cells.append (pygame.Rect (x, y, cellSize, cellSize))
+        self.bottomLeft = {0: 0, 90: board.width - 1, 180: len (board) - 1, 270: len (board) - board.width}[rotation]
+        self.columns, self.rows = (board.width, board.height) if rotation in (0, 180) else (board.height, board.width)
+        self.left, self.top = self.cells[self.bottomLeft].topleft
+        self.cellSize = int (cellSize)
+        self.step = int (step)
+        self.__board = (board.width, board.height, rotation)
+
+        self.surface = pygame.Surface (self.rect.size)
+        self.surface.fill (board.cellColor)
+        pygame.draw.rect (self.surface, (0,0,0), self.surface.get_rect(), 1)
+        for rect in self.cells:
+            pygame.draw.rect (self.surface, (0,0,0), rect.move (-leftX, -topY), 1)
+
+    def cellIndex (self, column: int, row: int) -> int:
+        """
+        Returns the index of the cell in the column and the row of the surface, counted from the bottom left of the surface.
+        """
+        width, height, rotation = self.__board
+        if rotation == 90:
+            return column * width + width - 1 - row
+        if rotation == 180:
+            return (height - 1 - row) * width + width - 1 - column
+        if rotation == 270:
+            return (height - 1 - column) * width + row
+        return row * width + column
+
+    def cellAt (self, x: int, y: int) -> int:
+        """
+        Returns the index of the cell that contains the pixel, or None. computed from the grid, without checking the cells.
+        """
+        offsetX, offsetY = x - self.left, self.top + self.cellSize - 1 - y
+        if offsetX < 0 or offsetY < 0:
+            return None
+        column, offsetX = divmod (offsetX, self.step)
+        row, offsetY = divmod (offsetY, self.step)
+        if column >= self.columns or row >= self.rows or offsetX >= self.cellSize or offsetY >= self.cellSize:
+            return None
+        return self.cellIndex (column, row)
+
+    def gapAt (self, x: int, y: int) -> tuple:
+        """
+        Returns the gap between cells that contains the pixel, as a tuple (direction, index of the cell), like Board.getGapByPixel:
+        the direction is 0 for a gap under a cell, 1 for a gap on the left of a cell (relative to the surface).
+        Returns None if the pixel is in a cell, on the border of a cell or out of the gaps between the cells.
+        """
+        left, top, size, step = self.left, self.top, self.cellSize, self.step
+        column = max (0, -((left + size - x) // step)) # the first column that its right is not on the left of the pixel
+        if column >= self.columns or left + column * step + size == x:
+            return None
+        row = max (0, -((y - top) // step)) # the first row from the bottom that its top is not under the pixel
+        cellTop = top - row * step
+        if row >= self.rows or cellTop == y:
+            return None
+        if cellTop + size < y: # under the cell
+            if not row:
+                return None
+            direction = 0
+        elif cellTop + size == y:
+            return None
+        else: # on the left of the cell, or inside it
+            if not column or x >= left + column * step:
+                return None
+            direction = 1
+        return direction, self.cellIndex (column, row)
+
+    def restore (self, surface, rect: pygame.Rect):
+        """
+        Draw the grid again in an area of the surface, to erase what was drawn there.
+        """
+        surface.blit (self.surface, rect, rect.move (-self.rect.left, -self.rect.top))
+
+boardLayers = {} # the layers of the boards, by (surface size, board size, cell size, rotation, cell gap). only the layers of the last surface size are kept
+
+def boardLayer (board, surface, cellSize: int, cellGap: int) -> BoardLayer:
+    """
+    Returns the BoardLayer of the board on the surface. the layer is created only if there is no layer of the same size and rotation.
+    """
+    key = (surface.get_size(), board.width, board.height, cellSize, board.rotation, cellGap)
+    layer = boardLayers.get (key)
+    if layer is None:
+        if any (other[:4] != key[:4] for other in boardLayers): # the window is resized
+            boardLayers.clear()
+        layer = boardLayers[key] = BoardLayer (board, key[0], cellSize, cellGap)
+    return layer
+
+def drawBoard (board, surface, cellSize: int, cellGap: int = 5):
+    """
+    Draw the board on a specific surface, by the rotation of the board.
+    cellSize is the number of pixels of the cell and cellGap is the gap between cells in pixels.
+    The grid is blitted from its BoardLayer, and the blocks are drawn on it.
+    Returns the cell in the bottom left of the surface.
+    """
+    layer = boardLayer (board, surface, cellSize, cellGap)
+    board.rect = surface.blit (layer.surface, layer.rect)
+    for cell, rect in zip (board.cells, layer.cells):
+        cell.rect = rect
+    board.layer = layer
+    for block in board.blocks:
+        drawBlock (block, surface, cellGap, board.rotation)
+    return board.cells[layer.bottomLeft]
+
+def drawBlock (block, surface, gapSize: int, rotation: int):
+    """
+    Draw the block on a surface.
+    gapSize is for the width of the gap between blocks.
+    rotation is for the rotation of the board.
+    """
+    c = block.rightCells[0].rect
+    d = block.rightCells[1].rect
+
+    if (block.direction and rotation in (0,180)) or ((not block.direction) and rotation in (90, 270)): # the block is vertical in the surface
+        width = gapSize
+        height = c.height * 2 + gapSize
+    else: #the block is horizontal in the surface
+        width = c.width * 2 + gapSize
+        height = gapSize
+    if rotation:
+        if rotation == 90:
+            if block.direction:
+                topLeftX = d.left
+                topLeftY = d.top - gapSize
+            else:
+                topLeftX = c.left - gapSize
+                topLeftY = c.top
+        elif rotation == 270:
+            if block.direction:
+                topLeftX, topLeftY = c.bottomleft
+            else:
+                topLeftX, topLeftY = d.topright
+        else:
+            if block.direction:
+                topLeftX, topLeftY = d.topright
+            else:
+                topLeftX = d.left
+                topLeftY = d.top - gapSize
+    else:
+        if block.direction:
+            topLeftX = c.left - gapSize
+            topLeftY = c.top
+        else:
+            topLeftX, topLeftY = c.bottomleft
+    block.rect = pygame.draw.rect (surface, (100,100,100), (topLeftX, topLeftY, width, height))
+
+def drawPlayer (player):
+    """
+    Draw the player on the window of its game.
+    """
+    try:
+        currentCell = player.cell.rect
+        radius = currentCell.width * (3/8)
+        player.rect = pygame.draw.circle(player.game.window, player.color, currentCell.center, radius)
+        rect = player.game.board.rect
+        dictionnary = {
+            0: (rect.left, rect.top - 2, rect.width, 2),
+            90: (rect.left - 2, rect.top, 2, rect.height),
+            180: (*rect.bottomleft, rect.width, 2),
+            270: (*rect.topright, 2, rect.height)
+            }
+        pygame.draw.rect(player.game.window, player.color, dictionnary[(player.rotation - player.game.currentPlayer.rotation) % 360])
+    except AttributeError:
+        print (f"Can't draw {player.name} player.")
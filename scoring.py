@@ -0,0 +1,95 @@
+"""
+This module is for checking the scores of the candidates of findAction in parallel.
+Include scoreMoves - the scores of moves of a GameState, like Action.checkScore,
+and ScoringPool - a persistent pool of processes that check the scores of the actions of findAction.
+"""
+import os
+import pickle
+from time import perf_counter
+from concurrent.futures import ProcessPoolExecutor
+from ai import findAction
+from state import GameState
+
+workerPosition = [None, None] # the data and the GameState of the last position, in every process of the pool
+
+def scoreMoves (data: bytes, moves: list) -> list:
+    """
+    Returns the scores of the moves for the current side of the position, by the same rules as Action.checkScore.
+    data is the pickled GameState of the position. the state is loaded only if the position is new for the process.
+    """
+    if workerPosition[0] != data:
+        workerPosition[:] = data, pickle.loads (data)
+    state = workerPosition[1]
+    side = state.side
+    n = len (state)
+    others = [other for other in range (len (state.pawns)) if other != side]
+    scores = []
+    for move in moves:
+        if move < n:
+            shortest = min (state.distance (other) + 1 for other in others)
+            scores.append (shortest - (state.fields[side].distances[move] + 1))
+        elif state.apply (move):
+            shortest = min (state.distance (other) + 1 for other in others)
+            scores.append (shortest - (state.distance (side) + 1))
+            state.undo()
+        else:
+            scores.append (-n)
+    return scores
+
+class ScoringPool:
+    """
+    Persistent pool of processes that check the scores of the candidates of findAction.
+    The position is sent once for every decision as a pickled GameState, that contains only values (like QuoridorGame.status),
+    and every process keeps the state of the last position, so the candidates are checked without changing the game.
+    Attributes:
+        workers - the number of processes
+        elapsed - the seconds of the last decision
+        scored - the number of scores of the last decision
+    """
+    def __init__ (self, workers: int = None):
+        """
+        If no workers given, uses the number of the CPUs.
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.elapsed = 0
+        self.scored = 0
+        self.__pool = None
+
+    def __repr__ (self):
+        return f"ScoringPool: {self.scored} scores in {self.elapsed:.3f}s with {self.workers} processes"
+
+    def close (self):
+        """
+        Shut down the pool of processes.
+        """
+        if self.__pool is not None:
+            self.__pool.shutdown()
+            self.__pool = None
+
+    def findAction (self, player):
+        """
+        Same as findAction, with the scores checked by the pool.
+        """
+        return findAction (player, self)
+
+    def scoreActions (self, player, actions: list):
+        """
+        Check the scores of the actions of the player, and set them to the actions.
+        """
+        start = perf_counter()
+        if self.__pool is None:
+            self.__pool = ProcessPoolExecutor (self.workers)
+        board = player.game.board
+        n = len (board)
+        moves = []
+        for action in actions:
+            index = board.indexOf (action.cell)
+            moves.append (index if action.name == "move" else (action.direction + 1) * n + index)
+        data = pickle.dumps (GameState.fromGame (player.game))
+        chunk = -(-len (moves) // self.workers)
+        futures = [self.__pool.submit (scoreMoves, data, moves[index:index + chunk]) for index in range (0, len (moves), chunk)]
+        scores = [score for future in futures for score in future.result()]
+        for action, score in zip (actions, scores):
+            action.score = score
+        self.scored = len (scores)
+        self.elapsed = perf_counter() - start
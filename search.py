@@ -0,0 +1,352 @@
+"""
+This module is for the search engine of the AI.
+Include TranspositionTable - a fixed size table of the searched positions,
+and SearchEngine - an alpha-beta search with iterative deepening.
+"""
+from time import perf_counter
+from array import array
+from ai import Action, Zobrist
+from state import GameState
+
+class SearchTimeout (Exception):
+    """
+    Raised inside of the search when the time or the nodes are over.
+    """
+
+class TranspositionTable:
+    """
+    Fixed size table of searched positions, by their Zobrist hash.
+    Every entry stores the hash, the depth of the search, the score, the kind of the score (exact, lower bound or upper bound) and the best move.
+    The entries are stored in arrays, so the memory of the table is fixed.
+    A new entry replaces the entry in its place if the place is empty, if the old entry is from an older search,
+    or if the new entry is searched at least as deep.
+    Attributes:
+        size - the number of entries (a power of 2)
+        hits, misses - statistics of the probe method
+        stores - the number of stored entries
+        generation - the number of the current search, to know the entries of the older searches
+    """
+    EXACT = 0
+    LOWER = 1
+    UPPER = 2
+    ENTRY_SIZE = 19 # bytes of every entry
+
+    def __init__ (self, megabytes: float = 16):
+        """
+        The size of the table is the biggest power of 2 of entries that the given megabytes can contain.
+        """
+        size = 1
+        while size * 2 * self.ENTRY_SIZE <= megabytes * 2 ** 20:
+            size *= 2
+        self.size = size
+        self.__keys = array ("Q", bytes (8 * size))
+        self.__depths = array ("b", bytes (size))
+        self.__scores = array ("i", bytes (4 * size))
+        self.__flags = array ("B", bytes (size))
+        self.__moves = array ("i", bytes (4 * size))
+        self.__generations = array ("B", bytes (size)) # 0 for an empty entry
+        self.generation = 1
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    @property
+    def memory (self) -> int:
+        """
+        The memory of the entries in bytes.
+        """
+        return self.size * self.ENTRY_SIZE
+
+    @property
+    def hitRate (self) -> float:
+        if self.hits + self.misses:
+            return self.hits / (self.hits + self.misses)
+        return 0.0
+
+    def __repr__ (self):
+        return f"TranspositionTable: {self.size} entries ({self.memory / 2 ** 20:.1f} MB), {self.hits} hits, {self.misses} misses ({self.hitRate:.0%})"
+
+    def newSearch (self):
+        """
+        Start a new search. the entries of the older searches will be replaced first.
+        """
+        self.generation = self.generation % 255 + 1
+
+    def clear (self):
+        """
+        Remove all the entries and reset the statistics.
+        """
+        self.__generations = array ("B", bytes (self.size))
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    def probe (self, key: int):
+        """
+        Returns a tuple (depth, score, flag, move) of the position with the given hash. if not found, returns None.
+        move is None if no best move is stored.
+        """
+        index = key & (self.size - 1)
+        if self.__generations[index] and self.__keys[index] == key:
+            self.hits += 1
+            move = self.__moves[index]
+            return self.__depths[index], self.__scores[index], self.__flags[index], move - 1 if move else None
+        self.misses += 1
+        return None
+
+    def store (self, key: int, depth: int, score: int, flag: int, move: int = None):
+        """
+        Store the result of a search of the position with the given hash, if the replacement policy allows it.
+        """
+        index = key & (self.size - 1)
+        if self.__generations[index] == self.generation and self.__keys[index] != key and self.__depths[index] > depth:
+            return # keep the deeper entry of the current search
+        self.__keys[index] = key
+        self.__depths[index] = min (depth, 127)
+        self.__scores[index] = score
+        self.__flags[index] = flag
+        self.__moves[index] = move + 1 if move is not None else 0
+        self.__generations[index] = self.generation
+        self.stores += 1
+
+class SearchEngine:
+    """
+    Alpha-beta search engine for the AI players, with iterative deepening.
+    The search plays and undo moves on a GameState, so the game itself is not changed.
+    With more than two players, all the other players play against the player of the root (paranoid search).
+    The score of a position is the score of Action: the length of the shortest path of the other players minus the length of the path of the player.
+    The searched positions are stored in a transposition table, that is kept between the searches of the engine.
+    Attributes:
+        table - TranspositionTable of the engine
+        timeLimit - seconds for a search. None for no limit.
+        maxNodes - number of nodes for a search. None for no limit.
+        maxDepth - the deepest depth to search
+        nodes - the number of nodes of the last search
+        depth - the deepest completed depth of the last search
+        score - the score of the best move of the last search
+        elapsed - the seconds of the last search
+    """
+    WIN = 100000
+
+    def __init__ (self, timeLimit: float = 1.0, maxNodes: int = None, maxDepth: int = 32, tableSize: float = 16):
+        """
+        tableSize is the memory of the transposition table in megabytes.
+        """
+        self.table = TranspositionTable (tableSize)
+        self.timeLimit = timeLimit
+        self.maxNodes = maxNodes
+        self.maxDepth = maxDepth
+        self.nodes = 0
+        self.depth = 0
+        self.score = 0
+        self.elapsed = 0
+        self.__state = None
+        self.__root = 0
+        self.__rootKey = 0
+        self.__deadline = None
+        self.__stop = None
+
+    @property
+    def nodesPerSecond (self) -> float:
+        if self.elapsed:
+            return self.nodes / self.elapsed
+        return 0.0
+
+    def __repr__ (self):
+        return (f"AlphaBeta: depth {self.depth}, score {self.score}, {self.nodes} nodes in {self.elapsed:.2f}s ({self.nodesPerSecond:.0f} nodes/s), "
+                f"table hits {self.table.hitRate:.0%}")
+
+    def findAction (self, player) -> Action:
+        """
+        Search the best action for the player, that must be the current player of its game.
+        Returns an Action object.
+        """
+        return Action.fromMove (player, self.search (GameState.fromGame (player.game)))
+
+    def search (self, state: GameState, stop = None) -> int:
+        """
+        Search the best move for the side of the state, by deeper and deeper searches until the time or the nodes are over.
+        stop is an optional threading.Event of the search: if it is set by another thread, the search stops like at the end of the time.
+        The time and the nodes never stop the first depth, so the search always finds a move, but stop does.
+        Returns the best move of the deepest completed search (None if stop is set before the end of the first depth,
+        or if the side of the state has no move).
+        """
+        start = perf_counter()
+        self.__stop = stop
+        self.__deadline = start + self.timeLimit if self.timeLimit is not None else None
+        self.__state = state
+        self.__root = state.side
+        # with more than 2 players the scores are for the team of the root, so they depend on the root too
+        self.__rootKey = Zobrist.forBoard (state.width, state.height).sides[state.side] if len (state.pawns) > 2 else 0
+        self.table.newSearch()
+        self.nodes = 0
+        self.depth = 0
+        historyLength = len (state.history)
+        bestMove = None
+        try:
+            for depth in range (1, self.maxDepth + 1):
+                try:
+                    score, move = self.__searchRoot (depth, bestMove)
+                except SearchTimeout:
+                    while len (state.history) > historyLength:
+                        state.undo()
+                    break
+                bestMove = move
+                self.depth = depth
+                self.score = score
+                if abs (score) >= self.WIN - self.maxDepth:
+                    break # the end of the game is found
+        finally:
+            self.elapsed = perf_counter() - start
+            self.__state = None
+            self.__stop = None
+        return bestMove
+
+    def __checkBudget (self):
+        """
+        Raise SearchTimeout if the search is stopped, or if the time or the nodes are over after the first depth.
+        """
+        if self.__stop is not None and self.__stop.is_set():
+            raise SearchTimeout()
+        if not self.depth:
+            return
+        if self.maxNodes is not None and self.nodes >= self.maxNodes:
+            raise SearchTimeout()
+        if self.__deadline is not None and perf_counter() >= self.__deadline:
+            raise SearchTimeout()
+
+    def __evaluate (self) -> int:
+        """
+        The score of the position for the side of the state.
+        """
+        state = self.__state
+        root = self.__root
+        shortest = min (state.distance (side) for side in range (len (state.pawns)) if side != root)
+        score = shortest - state.distance (root)
+        return score if state.side == root else -score
+
+    def __orderedMoves (self, firstMove: int = None) -> list:
+        """
+        Returns the moves of the side of the state. first the given move, then the moves of the player
+        that get nearer to the target, then the blocks on the paths of the other players, and then the other moves of the player.
+        """
+        state = self.__state
+        side = state.side
+        distances = state.fields[side].distances
+        current = distances[state.pawns[side]]
+        forward = []
+        backward = []
+        for move in state.pawnMoves (side):
+            if distances[move] < current:
+                forward.append (move)
+            else:
+                backward.append (move)
+        forward.sort (key=distances.__getitem__)
+        moves = forward
+        if state.blocks[side]:
+            seen = set (forward)
+            for other in range (len (state.pawns)):
+                if other != side:
+                    for move in state.blocksOnPath (state.path (other)):
+                        if move not in seen:
+                            seen.add (move)
+                            moves.append (move)
+        moves += backward
+        if firstMove is not None and firstMove in moves:
+            moves.remove (firstMove)
+            moves.insert (0, firstMove)
+        return moves
+
+    def __searchRoot (self, depth: int, firstMove: int) -> tuple:
+        """
+        Search the root of the tree to the given depth. the first depth is stopped only by the stop event of the search.
+        Returns a tuple (score, move).
+        """
+        state = self.__state
+        alpha = -self.WIN - 1
+        bestMove = None
+        for move in self.__orderedMoves (firstMove):
+            self.__checkBudget() # the first depth can be smaller than the nodes between the checks of __negamax
+            side = state.side
+            if not state.apply (move):
+                continue
+            if bestMove is None:
+                bestMove = move
+            value = self.__child (side, depth, alpha, self.WIN + 1, 1)
+            state.undo()
+            if value > alpha:
+                alpha = value
+                bestMove = move
+        return alpha, bestMove
+
+    def __child (self, side: int, depth: int, alpha: int, beta: int, ply: int) -> int:
+        """
+        The score of the position after a move of the player of the given side, for the team of this player.
+        """
+        state = self.__state
+        if state.reached (side):
+            return self.WIN - ply
+        if (state.side == self.__root) == (side == self.__root): # the same team plays again
+            return self.__negamax (depth - 1, alpha, beta, ply)
+        return -self.__negamax (depth - 1, -beta, -alpha, ply)
+
+    def __negamax (self, depth: int, alpha: int, beta: int, ply: int) -> int:
+        """
+        Alpha-beta search of the position of the state.
+        Returns the score for the team of the side of the state.
+        The scores of the end of the game are stored in the table relative to the position (without the ply),
+        so they are the same from every path to the position.
+        """
+        self.nodes += 1
+        if not self.nodes & 255:
+            self.__checkBudget()
+        if depth <= 0:
+            return self.__evaluate()
+        state = self.__state
+        key = state.hash ^ self.__rootKey
+        firstMove = None
+        entry = self.table.probe (key)
+        if entry is not None:
+            entryDepth, score, flag, firstMove = entry
+            if entryDepth >= depth:
+                if score >= self.WIN - self.maxDepth * 4:
+                    score -= ply
+                elif score <= -self.WIN + self.maxDepth * 4:
+                    score += ply
+                if flag == TranspositionTable.EXACT:
+                    return score
+                if flag == TranspositionTable.LOWER and score >= beta:
+                    return score
+                if flag == TranspositionTable.UPPER and score <= alpha:
+                    return score
+        originalAlpha = alpha
+        best = None
+        bestMove = None
+        for move in self.__orderedMoves (firstMove):
+            side = state.side
+            if not state.apply (move):
+                continue
+            value = self.__child (side, depth, alpha, beta, ply + 1)
+            state.undo()
+            if best is None or value > best:
+                best = value
+                bestMove = move
+            if value > alpha:
+                alpha = value
+            if alpha >= beta:
+                break
+        if best is None: # no legal move
+            return self.__evaluate()
+        if best <= originalAlpha:
+            flag = TranspositionTable.UPPER
+        elif best >= beta:
+            flag = TranspositionTable.LOWER
+        else:
+            flag = TranspositionTable.EXACT
+        score = best
+        if score >= self.WIN - self.maxDepth * 4:
+            score += ply
+        elif score <= -self.WIN + self.maxDepth * 4:
+            score -= ply
+        self.table.store (key, depth, score, flag, bestMove)
+        return best
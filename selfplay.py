@@ -0,0 +1,143 @@
+"""
+This module is for playing games between AI players without a display.
+The games are played in a pool of processes, and a record of every game is written as a json line when the game ends.
+At the end, the number of games per second and moves per second is printed.
+With --record, the games are also written to a file of compact records (see record.py), text or binary.
+
+Usage:
+    python selfplay.py --games 100 --size 9 --players 2 --ai greedy --ai alphabeta:timeLimit=0.2
+Every --ai argument is the config of one player: an engine, and optional attributes of AIPlayer separated by commas.
+If less configs than players are given, the last config is used for the other players.
+"""
+import sys
+import json
+import argparse
+from random import Random
+from time import perf_counter
+from multiprocessing import Pool
+from game import QuoridorGame
+from record import GameRecord, RecordWriter
+
+def parseConfig (text: str) -> dict:
+    """
+    Returns a dict of AIPlayer arguments from a text like "alphabeta:timeLimit=0.2,maxNodes=5000".
+    The values are read as json if possible (numbers, null), else as strings.
+    The engines are played in the process of the game, so workers is 1 if not given.
+    """
+    engine, _, options = text.partition (":")
+    config = {"engine": engine, "workers": 1}
+    for option in filter (None, options.split (",")):
+        key, _, value = option.partition ("=")
+        try:
+            config[key] = json.loads (value)
+        except ValueError:
+            config[key] = value
+    return config
+
+def playGame (number: int, size: int, configs: list, maxMoves: int = 1000, randomMoves: int = 0, seed: int = 0) -> dict:
+    """
+    Play a game between AI players with the given configs (one for every player).
+    randomMoves is the number of random moves of player at the start of the game, for different games with the same players.
+    Returns the record of the game: the winner, the number of moves, the blocks used by every player,
+    the actions, the seconds of every action and the text of the GameRecord of the game.
+    """
+    names = [f"Player {index + 1}" for index in range (len (configs))]
+    game = QuoridorGame()
+    game.setup (players=names, ai_players=names, board_width=size, board_height=size,
+                ai_configs=dict (zip (names, configs)))
+    game.start()
+    players = list (game.players)
+    board = game.board
+    record = GameRecord (size, size, len (players))
+    walls = [0] * len (players)
+    random = Random (f"{seed} {number}")
+    actions = []
+    times = []
+    while game.running and len (actions) < maxMoves:
+        player = game.currentPlayer
+        start = perf_counter()
+        if len (actions) < randomMoves:
+            direction = random.choice (sorted (player.optionalMoves))
+            player.move (direction)
+            actions.append (["move", 0, player.position[0], player.position[1]])
+            record.append (board.indexOf (player.cell))
+        else:
+            action = player.chooseAction()
+            action()
+            actions.append (list (action.key))
+            move = board.indexOf (action.cell)
+            record.append (move + (action.direction + 1) * len (board) if action.name == "block" else move)
+            if action.name == "block":
+                walls[players.index (player)] += 1
+        times.append (round (perf_counter() - start, 6))
+        game.nextPlayer()
+    for player in players:
+        if player.searchEngine is not None and hasattr (player.searchEngine, "close"):
+            player.searchEngine.close()
+    winner = game.winner
+    return {
+        "game": number,
+        "size": size,
+        "players": len (configs),
+        "configs": configs,
+        "winner": players.index (winner) if winner else None,
+        "moves": len (actions),
+        "walls": walls,
+        "actions": actions,
+        "think": times,
+        "record": record.toText()
+        }
+
+def main (args: list = None):
+    """
+    Read the arguments of the command line, play the games and print the records and the statistics.
+    """
+    parser = argparse.ArgumentParser (description="Play games between AI players without a display.")
+    parser.add_argument ("--games", type=int, default=10, help="number of games")
+    parser.add_argument ("--size", type=int, default=9, help="width and height of the board")
+    parser.add_argument ("--players", type=int, default=2, choices=(2, 4), help="number of players")
+    parser.add_argument ("--ai", action="append", default=[], help="config of a player, like alphabeta:timeLimit=0.2 (repeat for every player)")
+    parser.add_argument ("--processes", type=int, default=None, help="number of processes (default: number of CPUs)")
+    parser.add_argument ("--max-moves", type=int, default=1000, help="maximum number of moves of a game")
+    parser.add_argument ("--random-moves", type=int, default=0, help="random moves at the start of every game")
+    parser.add_argument ("--seed", type=int, default=0, help="seed of the random moves")
+    parser.add_argument ("--output", default="-", help="file for the records of the games (default: stdout)")
+    parser.add_argument ("--record", default=None, help="file for the compact records of the games")
+    parser.add_argument ("--binary", action="store_true", help="write the compact records in binary")
+    options = parser.parse_args (args)
+
+    texts = options.ai or ["greedy"]
+    configs = [parseConfig (texts[min (index, len (texts) - 1)]) for index in range (options.players)]
+    output = sys.stdout if options.output == "-" else open (options.output, "w")
+    writer = RecordWriter (options.record, options.binary) if options.record else None
+    wins = [0] * options.players
+    totalMoves = 0
+    start = perf_counter()
+    try:
+        with Pool (options.processes) as pool:
+            tasks = [(number, options.size, configs, options.max_moves, options.random_moves, options.seed) for number in range (options.games)]
+            for record in pool.imap_unordered (playTask, tasks):
+                output.write (json.dumps (record) + "\n")
+                output.flush()
+                if writer is not None:
+                    writer.write (GameRecord.fromText (record["record"]))
+                totalMoves += record["moves"]
+                if record["winner"] is not None:
+                    wins[record["winner"]] += 1
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        if writer is not None:
+            writer.close()
+    elapsed = perf_counter() - start
+    print (f"{options.games} games, {totalMoves} moves in {elapsed:.2f}s: "
+           f"{options.games / elapsed:.2f} games/s, {totalMoves / elapsed:.1f} moves/s. wins: {wins}", file=sys.stderr)
+
+def playTask (task: tuple) -> dict:
+    """
+    playGame with the arguments in a tuple, for the pool.
+    """
+    return playGame (*task)
+
+if __name__ == "__main__":
+    main()
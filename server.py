@@ -0,0 +1,437 @@
+"""
+This module is for hosting many games in one process, by an asyncio server over TCP or a Unix socket.
+Every message is a json object in one line. A request has a "cmd" and optional "id", that is returned in the answer.
+Requests:
+    {"cmd": "create", "players": [names], "ai": [names of the AI players], "size": 9, "settings": {other settings of the game}}
+        - start a new game. answers the session number and the status of the game.
+    {"cmd": "load", "status": {a status of a running game}, "settings": {...}} - start a session from a status, like QuoridorGame.load
+    {"cmd": "subscribe", "session": number} - receive an event with the status after every change of the game
+    {"cmd": "unsubscribe", "session": number}
+    {"cmd": "status", "session": number}
+    {"cmd": "move", "session": number, "player": name, "direction": "top"} - same as Player.move
+    {"cmd": "block", "session": number, "player": name, "direction": 0, "x": 3, "y": 4} - same as Player.addBlock
+    {"cmd": "metrics", "session": number} - the latency of the requests of a session, or of all the sessions without session
+    {"cmd": "close", "session": number}
+The answers are {"ok": true, ...} or {"ok": false, "error": message}, and the events are {"event": "state", "session": number, "status": ...}.
+Every request is handled by its own task, so the answers may come in another order than the requests (use the ids).
+The moves of the AI players are searched in a pool of processes (searchMove), so the server keeps answering while the AI thinks.
+If a turn of an AI player fails, the event {"event": "error", "session": number, "error": message} is sent.
+A session is closed by the close command, when the connection that created it is closed, or a while after the end of its game.
+
+Usage:
+    python server.py --port 8765
+    python server.py --unix /tmp/quoridor.sock
+"""
+import json
+import asyncio
+import logging
+import argparse
+from collections import deque
+from itertools import count
+from time import perf_counter
+from concurrent.futures import ProcessPoolExecutor
+from ai import Action
+from state import GameState
+from game import QuoridorGame, AIPlayer
+
+logger = logging.getLogger (__name__)
+
+COMMANDS = ("create", "load", "metrics", "subscribe", "unsubscribe", "status", "close", "move", "block")
+
+searchers = {} # the AI players of searchMove in this process, by their settings
+
+def aiSettings (player: AIPlayer) -> dict:
+    """
+    Returns the settings of the engine of an AI player, for searchMove.
+    The mcts engine plays its rollouts in its process, because the searches of the sessions are already in a pool of processes.
+    """
+    return {"engine": player.engine, "timeLimit": player.timeLimit, "maxNodes": player.maxNodes, "tableSize": player.tableSize,
+            "iterations": player.iterations, "workers": player.workers or 1}
+
+def searchMove (settings: dict, state: GameState) -> int:
+    """
+    Search the move of an AI player with the settings (see aiSettings) in the state. It is called in a process of the pool of the server.
+    The players are kept in the process by their settings, so their engines keep their tables and trees between the searches.
+    """
+    key = tuple (sorted (settings.items()))
+    player = searchers.get (key)
+    if player is None:
+        player = searchers[key] = AIPlayer ("AI", "black", (1, 1), **settings)
+    return player.findMove (state)
+
+class Metrics:
+    """
+    Latency statistics of requests.
+    Attributes:
+        requests - the number of requests
+        total - the sum of the latencies in seconds
+        maximum - the biggest latency in seconds
+        recent - the latencies of the last requests, for the percentiles
+    """
+    def __init__ (self, size: int = 1000):
+        self.requests = 0
+        self.total = 0.0
+        self.maximum = 0.0
+        self.recent = deque (maxlen=size)
+
+    def add (self, latency: float):
+        self.requests += 1
+        self.total += latency
+        self.maximum = max (self.maximum, latency)
+        self.recent.append (latency)
+
+    def percentile (self, value: float) -> float:
+        """
+        Returns the percentile of the recent latencies, value between 0 and 1.
+        """
+        if not self.recent:
+            return 0.0
+        ordered = sorted (self.recent)
+        return ordered[min (len (ordered) - 1, int (value * len (ordered)))]
+
+    def report (self) -> dict:
+        """
+        Returns the statistics as a dict, in milliseconds.
+        """
+        return {
+            "requests": self.requests,
+            "mean-ms": round (1000 * self.total / self.requests, 3) if self.requests else 0.0,
+            "p50-ms": round (1000 * self.percentile (0.5), 3),
+            "p99-ms": round (1000 * self.percentile (0.99), 3),
+            "max-ms": round (1000 * self.maximum, 3)
+            }
+
+class Session:
+    """
+    A game that is hosted by the server.
+    Attributes:
+        number - the number of the session
+        game - the QuoridorGame
+        status - the status of the game after the last change. the game itself can be in the middle of a search of an AI player.
+        lock - asyncio.Lock, so the requests and the AI turns of the game are played one by one
+        subscribers - set of the queues of the connections that receive the events of the game
+        metrics - Metrics of the requests of the session
+        aiMetrics - Metrics of the turns of the AI players
+        owner - the queue of the connection that created the session, or None
+        aiTask - the asyncio task of the turns of the AI players, or None
+    """
+    def __init__ (self, number: int, game: QuoridorGame, owner: asyncio.Queue = None):
+        self.number = number
+        self.game = game
+        self.status = game.status()
+        self.lock = asyncio.Lock()
+        self.subscribers = set()
+        self.metrics = Metrics()
+        self.aiMetrics = Metrics()
+        self.owner = owner
+        self.aiTask = None
+
+    def event (self) -> dict:
+        return {"event": "state", "session": self.number, "status": self.status}
+
+    def broadcast (self):
+        """
+        Update the status after a change of the game, and send it to all the subscribers.
+        """
+        self.status = self.game.status()
+        message = self.event()
+        for queue in self.subscribers:
+            queue.put_nowait (message)
+
+    def close (self):
+        """
+        Cancel the task of the turns of the AI players. A search that runs in the pool is not stopped, but its move is ignored.
+        """
+        if self.aiTask is not None:
+            self.aiTask.cancel()
+
+class GameServer:
+    """
+    Asyncio server of many sessions.
+    Attributes:
+        sessions - dict of the sessions by their numbers
+        metrics - Metrics of all the requests
+        executor - the executor of the searches of the AI players (searchMove)
+        keepFinished - seconds to keep a session after the end of its game, so its clients can get the last status
+    """
+    def __init__ (self, executor = None, keepFinished: float = 60.0):
+        """
+        If no executor given, the AI moves are searched in a pool of processes. the searches are pure Python,
+        so in a pool of threads every search would slow down all the sessions of the server.
+        """
+        self.sessions = {}
+        self.metrics = Metrics (10000)
+        self.executor = executor or ProcessPoolExecutor()
+        self.keepFinished = keepFinished
+        self.__numbers = count (1)
+        self.__server = None
+
+    async def start (self, host: str = "127.0.0.1", port: int = 8765, path: str = None):
+        """
+        Start listening on a TCP port, or on a Unix socket if a path is given.
+        Returns the asyncio server.
+        """
+        if path:
+            self.__server = await asyncio.start_unix_server (self.__connection, path)
+        else:
+            self.__server = await asyncio.start_server (self.__connection, host, port)
+        return self.__server
+
+    async def stop (self):
+        if self.__server is not None:
+            self.__server.close()
+            await self.__server.wait_closed()
+            self.__server = None
+
+    async def __connection (self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Handle a connection: read the requests, and write the answers and the events of the subscribed sessions.
+        """
+        queue = asyncio.Queue()
+        sender = asyncio.ensure_future (self.__send (queue, writer))
+        tasks = set() # the requests that are not answered yet
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                start = perf_counter()
+                try:
+                    request = json.loads (line)
+                    if not isinstance (request, dict):
+                        raise ValueError ("a request must be a json object")
+                except ValueError as error:
+                    queue.put_nowait ({"ok": False, "error": str (error)})
+                    continue
+                # a request that waits (like a move during the turn of the AI) does not delay the next requests
+                task = asyncio.ensure_future (self.__answer (request, queue, start))
+                tasks.add (task)
+                task.add_done_callback (tasks.discard)
+        finally:
+            for task in list (tasks):
+                task.cancel()
+            await asyncio.gather (*tasks, return_exceptions=True)
+            for session in list (self.sessions.values()):
+                session.subscribers.discard (queue)
+                if session.owner is queue:
+                    self.__close (session)
+            queue.put_nowait (None)
+            await sender
+            writer.close()
+
+    async def __answer (self, request: dict, queue: asyncio.Queue, start: float):
+        """
+        Handle a request of a connection, and put the answer in the queue of the connection.
+        """
+        try:
+            answer = await self.handle (request, queue)
+        except (ValueError, KeyError, TypeError) as error:
+            answer = {"ok": False, "error": str (error)}
+        if "id" in request:
+            answer["id"] = request["id"]
+        queue.put_nowait (answer)
+        latency = perf_counter() - start
+        self.metrics.add (latency)
+        session = self.sessions.get (request.get ("session"))
+        if session is not None:
+            session.metrics.add (latency)
+
+    async def __send (self, queue: asyncio.Queue, writer: asyncio.StreamWriter):
+        """
+        Write the messages of the queue to the connection, until None.
+        """
+        while True:
+            message = await queue.get()
+            if message is None:
+                break
+            writer.write (json.dumps (message).encode() + b"\n")
+            try:
+                await writer.drain()
+            except ConnectionError:
+                break
+
+    def __session (self, request: dict) -> Session:
+        session = self.sessions.get (request.get ("session"))
+        if session is None:
+            raise ValueError (f"no session {request.get ('session')}")
+        return session
+
+    async def handle (self, request: dict, queue: asyncio.Queue = None) -> dict:
+        """
+        Execute a request and returns the answer. queue is the queue of the connection, for the events.
+        """
+        command = request["cmd"]
+        if command not in COMMANDS:
+            raise ValueError (f"unknown command {command}")
+        if command == "create":
+            game = QuoridorGame()
+            size = request.get ("size", 9)
+            game.setup (**request.get ("settings", {}))
+            game.setup (players=request.get ("players", ["Player 1", "Player 2"]), ai_players=request.get ("ai", []),
+                        board_width=size, board_height=size, ai_ponder=False) # the moves are searched in the pool, not by the players
+            game.start()
+            return self.__newSession (game, request, queue)
+        if command == "load":
+            game = QuoridorGame.fromStatus (request["status"], **{**request.get ("settings", {}), "ai_ponder": False})
+            return self.__newSession (game, request, queue)
+        if command == "metrics":
+            if "session" in request:
+                session = self.__session (request)
+                return {"ok": True, "requests": session.metrics.report(), "ai": session.aiMetrics.report()}
+            return {"ok": True, "sessions": len (self.sessions), "requests": self.metrics.report()}
+        session = self.__session (request)
+        if command == "subscribe":
+            session.subscribers.add (queue)
+            return {"ok": True, **session.event()}
+        if command == "unsubscribe":
+            session.subscribers.discard (queue)
+            return {"ok": True}
+        if command == "status":
+            return {"ok": True, "status": session.status}
+        if command == "close":
+            self.__close (session)
+            return {"ok": True}
+        if command in ("move", "block"):
+            async with session.lock:
+                game = session.game
+                if not game.running:
+                    return {"ok": False, "error": "the game is over"}
+                player = game.currentPlayer
+                if player.name != request.get ("player") or player.isAi:
+                    return {"ok": False, "error": f"it is the turn of {player.name}"}
+                if command == "move":
+                    done = player.move (str (request["direction"]).lower())
+                else:
+                    cell = game.board.index (int (request["x"]), int (request["y"]))
+                    done = cell is not None and player.addBlock (request["direction"], cell)
+                if not done:
+                    return {"ok": False, "error": f"can not {command} there"}
+                game.nextPlayer()
+                session.broadcast()
+            self.__startAi (session)
+            return {"ok": True}
+
+    def __newSession (self, game: QuoridorGame, request: dict, queue: asyncio.Queue) -> dict:
+        """
+        Add a session of a started game, and start the turns of its AI players. returns the answer of the request.
+        """
+        session = Session (next (self.__numbers), game, queue)
+        self.sessions[session.number] = session
+        if queue is not None and request.get ("subscribe", True):
+            session.subscribers.add (queue)
+        self.__startAi (session)
+        return {"ok": True, "session": session.number, "status": session.status}
+
+    def __close (self, session: Session):
+        """
+        Remove a session, and stop its AI players.
+        """
+        if self.sessions.get (session.number) is session:
+            del self.sessions[session.number]
+        session.close()
+
+    def __startAi (self, session: Session):
+        """
+        Start the task of the turns of the AI players of the session. If the game is over, the session is closed after keepFinished seconds.
+        """
+        if not session.game.running:
+            asyncio.get_running_loop().call_later (self.keepFinished, self.__close, session)
+            return
+        session.aiTask = asyncio.ensure_future (self.__playAi (session))
+        session.aiTask.add_done_callback (lambda task: self.__aiDone (session, task))
+
+    def __aiDone (self, session: Session, task: asyncio.Task):
+        """
+        The end of the task of the AI turns: if it failed, log the error and send it to the clients of the session.
+        """
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is None:
+            if not session.game.running: # the AI won
+                asyncio.get_running_loop().call_later (self.keepFinished, self.__close, session)
+            return
+        logger.error ("Session %d: the turn of the AI failed", session.number, exc_info=error)
+        message = {"event": "error", "session": session.number, "error": str (error)}
+        for queue in session.subscribers | ({session.owner} if session.owner is not None else set()):
+            queue.put_nowait (message)
+
+    async def __playAi (self, session: Session):
+        """
+        Play the turns of the AI players of the session, until the turn of a human player or the end of the game.
+        The moves are found in the executor on a GameState of the position, and executed in the event loop.
+        """
+        loop = asyncio.get_running_loop()
+        async with session.lock:
+            game = session.game
+            while game.running and game.currentPlayer.isAi:
+                player = game.currentPlayer
+                start = perf_counter()
+                move = await loop.run_in_executor (self.executor, searchMove, aiSettings (player), GameState.fromGame (game))
+                session.aiMetrics.add (perf_counter() - start)
+                Action.fromMove (player, move)()
+                game.nextPlayer()
+                session.broadcast()
+
+class GameClient:
+    """
+    Asyncio client of the server, for tests and for tools.
+    Attributes:
+        events - asyncio.Queue of the events of the subscribed sessions
+    """
+    def __init__ (self):
+        self.events = asyncio.Queue()
+        self.__reader = None
+        self.__writer = None
+        self.__answers = {}
+        self.__ids = count (1)
+        self.__receiver = None
+
+    async def connect (self, host: str = "127.0.0.1", port: int = 8765, path: str = None):
+        if path:
+            self.__reader, self.__writer = await asyncio.open_unix_connection (path)
+        else:
+            self.__reader, self.__writer = await asyncio.open_connection (host, port)
+        self.__receiver = asyncio.ensure_future (self.__receive())
+
+    async def __receive (self):
+        while True:
+            line = await self.__reader.readline()
+            if not line:
+                break
+            message = json.loads (line)
+            if "event" in message and "ok" not in message:
+                self.events.put_nowait (message)
+            elif message.get ("id") in self.__answers:
+                self.__answers.pop (message["id"]).set_result (message)
+
+    async def request (self, cmd: str, **kwargs) -> dict:
+        """
+        Send a request and wait for its answer.
+        """
+        number = next (self.__ids)
+        future = asyncio.get_running_loop().create_future()
+        self.__answers[number] = future
+        self.__writer.write (json.dumps ({"cmd": cmd, "id": number, **kwargs}).encode() + b"\n")
+        await self.__writer.drain()
+        return await future
+
+    async def close (self):
+        self.__writer.close()
+        if self.__receiver is not None:
+            self.__receiver.cancel()
+
+async def main (args: list = None):
+    parser = argparse.ArgumentParser (description="Host Quoridor games.")
+    parser.add_argument ("--host", default="127.0.0.1")
+    parser.add_argument ("--port", type=int, default=8765)
+    parser.add_argument ("--unix", default=None, help="path of a Unix socket, instead of TCP")
+    options = parser.parse_args (args)
+    logging.basicConfig (level=logging.INFO)
+    server = await GameServer().start (options.host, options.port, options.unix)
+    print (f"Listening on {options.unix or f'{options.host}:{options.port}'}", flush=True)
+    async with server:
+        await server.serve_forever()
+
+if __name__ == "__main__":
+    asyncio.run (main())
@@ -0,0 +1,509 @@
+"""
+This module is for the state of the game, without the board, the players and the window.
+Include GameState - a compact state of a game that can play and undo moves without changing the game itself.
+The state does not depend on pygame, so it can be sent to other processes and used by the AI while the game is displayed.
+"""
+from ai import DistanceField, Zobrist
+
+class GameState:
+    """
+    This class is a compact state of a game.
+    The cells are stored by their index in the board (like Board.cells), and the moves are integers:
+        lower than the number of cells - move the player to the cell of this index
+        number of cells + index - horizontal block, on the cell of the index (like Board.canPlaceBlock)
+        2 * number of cells + index - vertical block
+    The text notation of a move is the column as a letter (a is x=1) and the row as a number (1 is y=1), like "e2".
+    A block is the notation of its cell (like Board.canPlaceBlock) with "h" for horizontal or "v" for vertical, like "e3h".
+    The text of a position (str and fromString) is "size/pawns/blocks of the players/blocks on the board/side", like "9x9/e1,e9/10,10/-/0".
+    The moves are played and undone in place (make / unmake): apply and undo change only the indexes and the counters
+    of the state, and the geometry of every block is computed once for every size of board.
+    Attributes:
+        width, height - the size of the board
+        pawns - list of the indexes of the cells of the players
+        targets - list of the targets of the players, like Player.targetAsTuple
+        blocks - list of the number of blocks that every player has
+        side - the index of the player that has to play
+        maxBlocks - the number of the blocks the board can contain
+        blocksCount - the number of the blocks on the board
+        walls - list of the block moves on the board, by the order they were placed
+        fields - list of the DistanceField of every player
+        history - the played moves, to undo them. for a move of player, the previous cell of the player is stored instead.
+        hash - the Zobrist hash of the position, updated by every move. the same as QuoridorGame.zobristHash.
+        __wallUnder, __wallLeft, __slots - same as in Board
+    """
+    directions = (0, 1, 2, 3) # top, right, bottom, left
+    perpendicular = ((1, 3), (0, 2), (1, 3), (0, 2))
+    __geometries = {}
+
+    def __init__ (self, width: int, height: int, pawns: list, targets: list, blocks: list, side: int = 0, maxBlocks: int = None):
+        self.width = width
+        self.height = height
+        self.pawns = list (pawns)
+        self.targets = list (targets)
+        self.blocks = list (blocks)
+        self.side = side
+        self.maxBlocks = ((width + 1) * (height + 1)) // 5 if maxBlocks is None else maxBlocks
+        self.blocksCount = 0
+        self.walls = []
+        self.history = []
+        n = width * height
+        self.__wallUnder = bytearray (n)
+        self.__wallLeft = bytearray (n)
+        self.__slots = (bytearray (n), bytearray (n))
+        for index in range (n): # the slots on the edges of the board are always forbidden
+            if index < width or index % width == width - 1:
+                self.__slots[0][index] = 1
+            if index < width or index % width == 0:
+                self.__slots[1][index] = 1
+        self.__geometry = self.blockGeometry (width, height)
+        self.__zobrist = Zobrist.forBoard (width, height)
+        self.hash = self.__zobrist.sides[side]
+        for player, index in enumerate (self.pawns):
+            self.hash ^= self.__zobrist.pawns[player][index] ^ self.__zobrist.blocksLeft[player][self.blocks[player]]
+        fields = {}
+        for target in self.targets:
+            if target not in fields:
+                fields[target] = DistanceField (self, target)
+        self.fields = [fields[target] for target in self.targets]
+        self.__distinctFields = list (fields.values())
+
+    @classmethod
+    def initial (cls, width: int = 9, height: int = 9, players: int = 2):
+        """
+        Create the state of the start of a game, with the same positions and targets as QuoridorGame.start.
+        Raises ValueError if the number of the players is not 2 or 4.
+        """
+        if players not in (2, 4):
+            raise ValueError ("The game must have 2 or 4 players.")
+        if players == 2:
+            positions = ((width // 2 + 1, 1), (width // 2 + 1, height))
+            targets = (("y", height), ("y", 1))
+        else:
+            if not width == height:
+                raise ValueError ("4 players must play on a squared board!")
+            positions = ((width // 2 + 1, 1), (width, height // 2 + 1), (width // 2 + 1, height), (1, height // 2 + 1))
+            targets = (("y", height), ("x", 1), ("y", 1), ("x", width))
+        maxBlocks = ((width + 1) * (height + 1)) // 5
+        return cls (width, height, [(y - 1) * width + x - 1 for x, y in positions], targets,
+                    [maxBlocks // players] * players, 0, maxBlocks)
+
+    @classmethod
+    def fromGame (cls, game):
+        """
+        Create a state from a running QuoridorGame.
+        """
+        board = game.board
+        state = cls (board.width, board.height,
+                     [board.indexOf (player.cell) for player in game.players],
+                     [player.targetAsTuple for player in game.players],
+                     [player.blocks for player in game.players],
+                     game.players.index (game.currentPlayer),
+                     board.MAX_BLOCKS)
+        for block in board.blocks:
+            state.placeBlock (state.blockMove (block.direction, board.indexOf (block.rightCells[0])))
+        return state
+
+    def toGame (self, game = None):
+        """
+        Write the state to a running QuoridorGame, with the same size of board and number of players.
+        If no game is given, a new game is started for the state.
+        Returns the game.
+        """
+        if game is None:
+            from game import QuoridorGame # game imports this module
+            game = QuoridorGame()
+            game.setup (players=[f"Player {side + 1}" for side in range (len (self.pawns))], board_width=self.width, board_height=self.height)
+            game.start()
+        board = game.board
+        if (board.width, board.height) != (self.width, self.height) or len (game.players) != len (self.pawns):
+            raise ValueError ("The game does not match the state.")
+        while board.blocks:
+            board.popBlock()
+        n = len (self)
+        for move in self.walls:
+            direction, index = divmod (move - n, n)
+            board.addBlock (direction, index % self.width + 1, index // self.width + 1)
+        for side, player in enumerate (game.players):
+            player.cell = board.cells[self.pawns[side]]
+            player.blocks = self.blocks[side]
+        game.currentPlayer = game.players[self.side]
+        game.currentPlayer.currentAction = "move"
+        board.rotation = game.currentPlayer.rotation
+        return game
+
+    @classmethod
+    def fromString (cls, text: str):
+        """
+        Create a state from the text of a position (see str). the targets are the targets of the players of a new game.
+        Raises ValueError if the text is not a legal position.
+        """
+        try:
+            size, pawns, blocks, walls, side = text.strip().split ("/")
+            width, height = (int (value) for value in size.lower().split ("x"))
+            if len (pawns.split (",")) not in (2, 4):
+                raise ValueError
+            state = cls.initial (width, height, len (pawns.split (",")))
+            state = cls (width, height, [state.parseMove (pawn) for pawn in pawns.split (",")], state.targets,
+                         [int (count) for count in blocks.split (",")], int (side), state.maxBlocks)
+            if not 0 <= state.side < len (state.pawns) or len (state.blocks) != len (state.pawns):
+                raise ValueError
+            if walls != "-":
+                for wall in walls.split (","):
+                    move = state.parseMove (wall)
+                    if move < len (state) or not state.canPlaceBlock (move):
+                        raise ValueError
+                    state.placeBlock (move)
+        except (ValueError, IndexError, KeyError):
+            raise ValueError (f"Illegal position: {text}")
+        return state
+
+    def __str__ (self):
+        """
+        The text of the position, like "9x9/e1,e9/10,10/-/0".
+        """
+        return "/".join ((f"{self.width}x{self.height}",
+                          ",".join (self.notation (pawn) for pawn in self.pawns),
+                          ",".join (str (count) for count in self.blocks),
+                          ",".join (self.notation (wall) for wall in self.walls) or "-",
+                          str (self.side)))
+
+    def copy (self):
+        """
+        Returns a new state of the same position, with the same history.
+        """
+        state = self.__class__ (self.width, self.height, self.pawns, self.targets, self.blocks, self.side, self.maxBlocks)
+        state.__setstate__ ((self.walls, self.history))
+        return state
+
+    def __reduce__ (self):
+        """
+        A state is pickled by its values only. the edges, the slots and the distance fields are built again from the walls.
+        """
+        return (self.__class__, (self.width, self.height, self.pawns, self.targets, self.blocks, self.side, self.maxBlocks),
+                (self.walls, self.history))
+
+    def __setstate__ (self, values: tuple):
+        walls, history = values
+        for move in walls:
+            self.placeBlock (move)
+        self.history = list (history)
+
+    def __eq__ (self, other) -> bool:
+        try:
+            return (self.hash == other.hash and self.pawns == other.pawns and self.blocks == other.blocks
+                    and self.side == other.side and sorted (self.walls) == sorted (other.walls))
+        except AttributeError:
+            return False
+
+    def __hash__ (self):
+        return self.hash
+
+    def __len__ (self):
+        """
+        len function returns the number of cells in the board.
+        """
+        return self.width * self.height
+
+    @classmethod
+    def blockGeometry (cls, width: int, height: int) -> list:
+        """
+        Returns the geometry of every block of a board size, by move - number of cells. computed only once for every size.
+        The geometry of a block is a tuple (cells, edges, forbidden):
+            cells - the indexes of the 2 cells in the edges index of the direction of the block (like Board.__wallUnder and Board.__wallLeft)
+            edges - tuples of two indexes of cells that the block separates
+            forbidden - tuples (direction, index) of the slots that the block takes or crosses
+        """
+        if (width, height) not in cls.__geometries:
+            n = width * height
+            geometry = []
+            for move in range (2 * n):
+                direction, index = divmod (move, n)
+                column = index % width
+                if direction:
+                    if not column or index < width: # never placed
+                        geometry.append (None)
+                        continue
+                    cells = (index, index - width)
+                    edges = ((index, index - 1), (index - width, index - width - 1))
+                    forbidden = [(1, index), (1, index - width)]
+                    if index + width < n:
+                        forbidden.append ((1, index + width))
+                    forbidden.append ((0, index - 1))
+                else:
+                    if column == width - 1 or index < width: # never placed
+                        geometry.append (None)
+                        continue
+                    cells = (index, index + 1)
+                    edges = ((index, index - width), (index + 1, index + 1 - width))
+                    forbidden = [(0, index)]
+                    if column:
+                        forbidden.append ((0, index - 1))
+                    forbidden.append ((0, index + 1))
+                    forbidden.append ((1, index + 1))
+                geometry.append ((cells, edges, tuple (forbidden)))
+            cls.__geometries[(width, height)] = geometry
+        return cls.__geometries[(width, height)]
+
+    def blockMove (self, direction: int, index: int) -> int:
+        """
+        Returns the move of a block in the given direction (0=horizontal, 1=vertical) on the cell of the index.
+        """
+        return (direction + 1) * len (self) + index
+
+    def notation (self, move: int) -> str:
+        """
+        Returns the text notation of the move, like "e2" or "e3h".
+        """
+        n = len (self)
+        direction, index = divmod (move, n)
+        text = f"{chr (ord ('a') + index % self.width)}{index // self.width + 1}"
+        return text + ("", "h", "v")[direction]
+
+    def parseMove (self, text: str) -> int:
+        """
+        Returns the move of the text notation. the move is not checked.
+        Raises ValueError if the text is not a notation of a cell or a block of the board.
+        """
+        text = text.strip().lower()
+        direction = 0
+        if text[-1:] in ("h", "v"):
+            direction = 1 if text[-1] == "h" else 2
+            text = text[:-1]
+        if len (text) < 2 or not text[0].isalpha() or not text[1:].isdigit():
+            raise ValueError (f"Illegal move: {text}")
+        x = ord (text[0]) - ord ("a") + 1
+        y = int (text[1:])
+        if not (1 <= x <= self.width and 1 <= y <= self.height):
+            raise ValueError (f"Illegal move: {text}")
+        return direction * len (self) + (y - 1) * self.width + x - 1
+
+    def openNeighbors (self, index: int, neighbors: list = None) -> list:
+        """
+        Same as Board.openNeighbors.
+        """
+        width = self.width
+        if neighbors is None:
+            neighbors = []
+        else:
+            neighbors.clear()
+        if index + width < len (self) and not self.__wallUnder[index + width]:
+            neighbors.append (index + width)
+        if (index + 1) % width and not self.__wallLeft[index + 1]:
+            neighbors.append (index + 1)
+        if index >= width and not self.__wallUnder[index]:
+            neighbors.append (index - width)
+        if index % width and not self.__wallLeft[index]:
+            neighbors.append (index - 1)
+        return neighbors
+
+    def step (self, index: int, direction: int) -> int:
+        """
+        Returns the index of the cell next to the cell of the given index in the given direction (0=top, 1=right, 2=bottom, 3=left).
+        Returns -1 if there is no cell there or if there is a block between the cells.
+        """
+        width = self.width
+        if direction == 0:
+            if index + width < len (self) and not self.__wallUnder[index + width]:
+                return index + width
+        elif direction == 1:
+            if (index + 1) % width and not self.__wallLeft[index + 1]:
+                return index + 1
+        elif direction == 2:
+            if index >= width and not self.__wallUnder[index]:
+                return index - width
+        elif index % width and not self.__wallLeft[index]:
+            return index - 1
+        return -1
+
+    def __markBlock (self, move: int, step: int):
+        """
+        Update the edges, the slots, the hash and the distance fields for a block move.
+        step is 1 if the block is added, -1 if removed.
+        """
+        offset = move - len (self)
+        cells, edges, forbidden = self.__geometry[offset]
+        wall = self.__wallLeft if offset >= len (self) else self.__wallUnder
+        wall[cells[0]] += step
+        wall[cells[1]] += step
+        slots = self.__slots
+        for slotDirection, slot in forbidden:
+            slots[slotDirection][slot] += step
+        self.hash ^= self.__zobrist.blocks[offset]
+        for field in self.__distinctFields:
+            if step > 0:
+                field.edgesRemoved (edges)
+            else:
+                field.edgesAdded (edges)
+
+    def canPlaceBlock (self, move: int) -> bool:
+        """
+        Check if the slot of the block move is empty and the board can contain another block. the paths are not checked.
+        """
+        n = len (self)
+        return self.blocksCount < self.maxBlocks and not self.__slots[move // n - 1][move % n]
+
+    def placeBlock (self, move: int):
+        """
+        Place a block on the board, without checking and without changing the side or the blocks of the players.
+        """
+        self.__markBlock (move, 1)
+        self.blocksCount += 1
+        self.walls.append (move)
+
+    def __removeBlock (self):
+        """
+        Remove the last placed block.
+        """
+        self.__markBlock (self.walls.pop(), -1)
+        self.blocksCount -= 1
+
+    def __disconnected (self) -> bool:
+        """
+        Check if a player can not reach its target.
+        """
+        pawns = self.pawns
+        for side, field in enumerate (self.fields):
+            if field.distances[pawns[side]] == field.unreachable:
+                return True
+        return False
+
+    def isLegal (self, move: int) -> bool:
+        """
+        Check if the move is legal for the player of the current side.
+        """
+        if move < len (self):
+            return move in self.pawnMoves()
+        if not self.blocks[self.side] or not self.canPlaceBlock (move):
+            return False
+        self.placeBlock (move)
+        disconnected = self.__disconnected()
+        self.__removeBlock()
+        return not disconnected
+
+    def legalMoves (self) -> list:
+        """
+        Returns a list of all the legal moves of the player of the current side: first the moves of the player, then the blocks.
+        """
+        moves = self.pawnMoves()
+        if self.blocks[self.side] and self.blocksCount < self.maxBlocks:
+            n = len (self)
+            for offset, geometry in enumerate (self.__geometry):
+                if geometry is not None and self.isLegal (n + offset):
+                    moves.append (n + offset)
+        return moves
+
+    def apply (self, move: int) -> bool:
+        """
+        Play the move for the player of the current side, and pass the turn to the next player.
+        A move of player is not checked (use pawnMoves).
+        A block is checked: if the player has no blocks, the slot is not empty or the block will block the way of a player, nothing is changed.
+        Returns True if the move is played, else False.
+        """
+        side = self.side
+        keys = self.__zobrist
+        if move < len (self):
+            self.history.append (self.pawns[side])
+            self.hash ^= keys.pawns[side][self.pawns[side]] ^ keys.pawns[side][move]
+            self.pawns[side] = move
+        else:
+            if not self.blocks[side] or not self.canPlaceBlock (move):
+                return False
+            self.placeBlock (move)
+            if self.__disconnected():
+                self.__removeBlock()
+                return False
+            self.hash ^= keys.blocksLeft[side][self.blocks[side]] ^ keys.blocksLeft[side][self.blocks[side] - 1]
+            self.blocks[side] -= 1
+            self.history.append (move)
+        self.side = (side + 1) % len (self.pawns)
+        self.hash ^= keys.sides[side] ^ keys.sides[self.side]
+        return True
+
+    def undo (self):
+        """
+        Undo the last played move.
+        """
+        keys = self.__zobrist
+        side = (self.side - 1) % len (self.pawns)
+        self.hash ^= keys.sides[self.side] ^ keys.sides[side]
+        self.side = side
+        entry = self.history.pop()
+        if entry < len (self):
+            self.hash ^= keys.pawns[side][self.pawns[side]] ^ keys.pawns[side][entry]
+            self.pawns[side] = entry
+        else:
+            self.__removeBlock()
+            self.hash ^= keys.blocksLeft[side][self.blocks[side]] ^ keys.blocksLeft[side][self.blocks[side] + 1]
+            self.blocks[side] += 1
+
+    def distance (self, side: int) -> int:
+        """
+        Returns the number of steps of the player of the given side to its target.
+        """
+        return self.fields[side].distances[self.pawns[side]]
+
+    def reached (self, side: int) -> bool:
+        """
+        Check if the player of the given side is on its target.
+        """
+        return self.distance (side) == 0
+
+    @property
+    def winner (self) -> int:
+        """
+        The side of the player that reached its target, or None.
+        """
+        for side in range (len (self.pawns)):
+            if self.reached (side):
+                return side
+        return None
+
+    def pawnMoves (self, side: int = None) -> list:
+        """
+        Returns a list of the indexes of the cells that the player can move to, by the same rules as Player.optionalMoves.
+        """
+        if side is None:
+            side = self.side
+        pawns = self.pawns
+        moves = []
+        for direction in self.directions:
+            neighbor = self.step (pawns[side], direction)
+            if neighbor < 0:
+                continue
+            if neighbor in pawns:
+                jump = self.step (neighbor, direction) # jump over the player
+                if jump >= 0 and jump not in pawns:
+                    moves.append (jump)
+                    continue
+                for other in self.perpendicular[direction]:
+                    diagonal = self.step (neighbor, other)
+                    if diagonal >= 0 and diagonal not in pawns and diagonal not in moves:
+                        moves.append (diagonal)
+            elif neighbor not in moves:
+                moves.append (neighbor)
+        return moves
+
+    def path (self, side: int) -> list:
+        """
+        Returns the shortest path of the player of the given side, as a list of indexes.
+        """
+        return self.fields[side].pathIndexes (self.pawns[side])
+
+    def blocksOnPath (self, path: list) -> list:
+        """
+        Returns the block moves that cross the given path, the same candidates as findAction.
+        """
+        width = self.width
+        moves = []
+        for first, second in zip (path, path[1:]):
+            if first % width == second % width: # the cells are on the same column
+                cell = max (first, second)
+                moves.append (self.blockMove (0, cell))
+                if cell % width: #there is also a possibility to place a block on the cell of the left
+                    moves.append (self.blockMove (0, cell - 1))
+            else: #the cells are on the same row
+                cell = max (first, second)
+                moves.append (self.blockMove (1, cell))
+                if cell + width < len (self): #there is also a possibility to place a block on the cell of the top
+                    moves.append (self.blockMove (1, cell + width))
+        return moves
@@ -0,0 +1,50 @@
+"""
+Round-trips of the records of games, as text and as binary.
+"""
+import io
+from random import Random
+from state import GameState
+from record import GameRecord, RecordWriter, readRecords
+
+def playRecord (size: int, players: int = 2, seed: int = 1, moves: int = 40) -> GameRecord:
+    """
+    A record of random legal moves from the start of a game.
+    """
+    random = Random (seed)
+    state = GameState.initial (size, size, players)
+    record = GameRecord.fromState (state)
+    while len (record) < moves and state.winner is None:
+        move = random.choice (state.legalMoves())
+        state.apply (move)
+        record.append (move)
+    return record
+
+def testText ():
+    record = playRecord (9)
+    assert GameRecord.fromText (record.toText()) == record
+    assert GameRecord.fromText (record.toText()).replay().hash == record.replay().hash
+
+def testBytes ():
+    for record in (playRecord (5), playRecord (9, 4), playRecord (13)): # 1 and 2 bytes for the moves
+        assert GameRecord.read (io.BytesIO (record.toBytes())) == record
+
+def testStartPosition ():
+    start = playRecord (9, seed=2, moves=10).replay()
+    record = GameRecord.fromState (start)
+    record.append (start.legalMoves()[0])
+    assert record.start == str (start)
+    assert GameRecord.fromText (record.toText()) == record
+    assert GameRecord.read (io.BytesIO (record.toBytes())) == record
+
+def testFiles (tmp_path):
+    records = [playRecord (9, seed=seed) for seed in range (5)] + [playRecord (11, 4, seed=5)]
+    for binary in (False, True):
+        path = str (tmp_path / ("records.bin" if binary else "records.txt"))
+        with RecordWriter (path, binary) as writer:
+            for record in records[:3]:
+                writer.write (record)
+            for record in records[3:]: # move by move, while the game is played
+                writer.begin (record.initialState())
+                for move in record.moves:
+                    writer.move (move)
+        assert list (readRecords (path)) == records
@@ -0,0 +1,48 @@
+"""
+Drive a GameServer through a GameClient over a Unix socket.
+"""
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from server import GameServer, GameClient
+
+async def nextEvent (client: GameClient) -> dict:
+    return await asyncio.wait_for (client.events.get(), 10)
+
+async def playSession (path: str):
+    server = GameServer (ProcessPoolExecutor (1))
+    await server.start (path=path)
+    client = GameClient()
+    try:
+        await client.connect (path=path)
+        answer = await client.request ("create", players=["me", "bot"], ai=["bot"], size=5)
+        assert answer["ok"]
+        session = answer["session"]
+        assert answer["status"]["current-player"] == "me"
+
+        answer = await client.request ("move", session=session, player="bot", direction="top")
+        assert not answer["ok"]
+        answer = await client.request ("move", session=session, player="me", direction="top")
+        assert answer["ok"]
+        assert (await nextEvent (client))["status"]["current-player"] == "bot"
+        event = await nextEvent (client) # the reply of the AI
+        assert event["session"] == session
+        assert event["status"]["current-player"] == "me"
+
+        answer = await client.request ("metrics", session=session)
+        assert answer["ok"]
+        assert answer["ai"]["requests"] == 1
+        assert answer["requests"]["requests"] >= 2
+        answer = await client.request ("metrics")
+        assert answer["sessions"] == 1
+
+        assert (await client.request ("bogus", session=session))["error"] == "unknown command bogus"
+        assert (await client.request ("close", session=session))["ok"]
+        assert not (await client.request ("status", session=session))["ok"]
+        assert not server.sessions
+    finally:
+        await client.close()
+        await server.stop()
+        server.executor.shutdown()
+
+def testSession (tmp_path):
+    asyncio.run (playSession (str (tmp_path / "server.sock")))
@@ -0,0 +1,216 @@
+"""
+This module is for the turns of the AI players in the background, while the game is displayed.
+Include AIWorker - find the move of an AI player in a thread, on a snapshot of the position (GameState),
+so the window keeps handling its events while the AI thinks,
+Ponderer - find the moves of an AI player for the likely replies of the other player, while the other player thinks,
+and likelyReplies - the replies that the Ponderer checks first.
+"""
+from threading import Thread, Lock, Event
+from time import perf_counter
+from ai import Action
+from state import GameState
+
+class AIWorker:
+    """
+    Find the moves of the AI players in a thread. The game is not used by the thread: the player thinks on a GameState of the position.
+    Attributes:
+        player - the AIPlayer that thinks, or None
+        startTime - the perf_counter of the start of the thinking
+        onDone - optional function without arguments, called by the thread when the move is found (like posting an event to the window)
+        __thread - the thread of the last thinking
+        __stop - the Event that stops the search of the last thinking
+        __result - tuple (move, exception) when the thinking is done, else None
+        __generation - the number of the current thinking. the results of the canceled thinkings are ignored.
+        __lock - Lock of the result
+    """
+    def __init__ (self, onDone = None):
+        self.player = None
+        self.startTime = 0
+        self.onDone = onDone
+        self.__thread = None
+        self.__stop = Event()
+        self.__result = None
+        self.__generation = 0
+        self.__lock = Lock()
+
+    def __repr__ (self):
+        if self.player is None:
+            return "AIWorker: idle"
+        return f"AIWorker: {self.player.name} thinks for {self.elapsed:.1f}s"
+
+    @property
+    def thinking (self) -> bool:
+        """
+        True from the start of the thinking until the result is taken or the thinking is canceled.
+        """
+        return self.player is not None
+
+    @property
+    def done (self) -> bool:
+        """
+        True if the move is found and not taken yet.
+        """
+        return self.__result is not None
+
+    @property
+    def elapsed (self) -> float:
+        """
+        The seconds of the current thinking.
+        """
+        return perf_counter() - self.startTime if self.thinking else 0.0
+
+    @property
+    def nodes (self) -> int:
+        """
+        The nodes (of SearchEngine) or the rollouts (of MCTSEngine) of the current thinking. 0 for the greedy engine.
+        """
+        engine = self.player.searchEngine if self.player is not None else None
+        return getattr (engine, "nodes", getattr (engine, "rollouts", 0))
+
+    def start (self, player):
+        """
+        Start the thinking of the player, that must be the current player of its game.
+        The thread of a canceled thinking is not waited for here: the new thread waits for it, before it uses the engine.
+        """
+        self.cancel()
+        state = GameState.fromGame (player.game)
+        with self.__lock:
+            self.player = player
+            self.startTime = perf_counter()
+            generation = self.__generation
+            self.__stop = Event()
+        self.__thread = Thread (target=self.__run, args=(player, state, generation, self.__stop, self.__thread), daemon=True)
+        self.__thread.start()
+
+    def __run (self, player, state: GameState, generation: int, stop: Event, previous: Thread):
+        """
+        The thread of the thinking. previous is the thread of the last thinking, that may use the same engine.
+        """
+        if previous is not None:
+            previous.join()
+        if stop.is_set():
+            return # canceled before the start
+        try:
+            result = (player.chooseMove (state, stop), None)
+        except Exception as error:
+            result = (None, error)
+        with self.__lock:
+            if generation != self.__generation:
+                return # canceled
+            self.__result = result
+        if self.onDone is not None:
+            self.onDone()
+
+    def result (self) -> Action:
+        """
+        Returns the Action of the found move, or None if the thinking is not done. After that, the worker is idle.
+        Raises the exception of the thinking if there was one.
+        """
+        with self.__lock:
+            if self.__result is None:
+                return None
+            (move, error), player = self.__result, self.player
+            self.__result = None
+            self.player = None
+        if error is not None:
+            raise error
+        return Action.fromMove (player, move)
+
+    def cancel (self):
+        """
+        Cancel the current thinking: the search of the engine is stopped (the greedy engine ends its search), and its result is ignored.
+        """
+        with self.__lock:
+            self.__generation += 1
+            self.__result = None
+            self.player = None
+            self.__stop.set()
+
+def likelyReplies (state: GameState, side: int) -> list:
+    """
+    Returns the legal moves of the current player of the state, ordered by their chance to be played against the player of the given side:
+    first the step on the shortest path, then the other steps, and then the blocks on the shortest path of the player of the side.
+    """
+    path = state.path (state.side)
+    steps = state.pawnMoves()
+    moves = [path[1]] if len (path) > 1 and path[1] in steps else []
+    moves += [move for move in steps if move not in moves]
+    for move in state.blocksOnPath (state.path (side)):
+        if move not in moves and state.isLegal (move):
+            moves.append (move)
+    return moves
+
+class Ponderer:
+    """
+    Find the moves of an AI player in a thread, while the other player thinks on its turn (pondering).
+    For every likely reply of the other player (likelyReplies), the player searches its move in the position after the reply,
+    and the move is kept in the cache by the Zobrist hash of that position. If the reply is played, the move is taken from the cache.
+    Only the searches that are completed are kept, so the moves of the cache are as good as the moves of a normal search.
+    Attributes:
+        player - the AIPlayer
+        engine - the engine of the pondering, created by the settings of the player (None for the greedy engine).
+                 it is not the engine of the player, so the player can search while the pondering stops, and the tree of MCTSEngine is kept.
+        cache - dict of the moves of the player, by the hash of the positions
+        hits - the number of the moves that were taken from the cache
+        __thread - the thread of the pondering, or None
+        __stop - the Event that stops the pondering
+    """
+    def __init__ (self, player):
+        self.player = player
+        self.engine = player.newEngine()
+        self.cache = {}
+        self.hits = 0
+        self.__thread = None
+        self.__stop = Event()
+
+    def __repr__ (self):
+        return f"Ponderer: {len (self.cache)} positions, {self.hits} hits"
+
+    @property
+    def pondering (self) -> bool:
+        return self.__thread is not None and self.__thread.is_alive()
+
+    def start (self, state: GameState, side: int):
+        """
+        Start the pondering of the player of the given side, in the position of the state (the turn of the other player).
+        The moves of the previous pondering are forgotten.
+        """
+        self.stop()
+        self.cache = {}
+        self.__stop = Event()
+        self.__thread = Thread (target=self.__run, args=(state, side, self.__stop, self.cache, self.__thread), daemon=True)
+        self.__thread.start()
+
+    def __run (self, state: GameState, side: int, stop: Event, cache: dict, previous: Thread):
+        """
+        The thread of the pondering. previous is the thread of the last pondering, that may still use the engine.
+        """
+        if previous is not None:
+            previous.join()
+        for reply in likelyReplies (state, side):
+            position = state.copy()
+            position.apply (reply)
+            if position.winner is not None or position.side != side:
+                continue # the game is over, or another player plays before the player
+            if stop.is_set():
+                return
+            move = self.player.findMove (position, stop, self.engine)
+            if stop.is_set():
+                return # the search was stopped before its end
+            cache[position.hash] = move
+
+    def stop (self):
+        """
+        Stop the pondering without waiting for the end of the thread. The moves that were found are kept in the cache.
+        """
+        self.__stop.set()
+
+    def take (self, key: int) -> int:
+        """
+        Returns the move of the position of the hash from the cache, or None. The cache is emptied, because the game goes on.
+        """
+        move = self.cache.get (key)
+        self.cache = {}
+        if move is not None:
+            self.hits += 1
+        return move